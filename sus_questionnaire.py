@@ -1,48 +1,271 @@
+import sys
+import numpy as np
+import pandas as pd
+from typing import Iterable, Iterator
+
+'''
+Scores System Usability Scale (SUS) questionnaires. Single responses can be scored with calculate_sus_score(), large
+survey exports are streamed in chunks and tallied, so the statistics are computed from counts instead of from every
+response. Scoring the csv exports of a survey (the last 10 columns are the answers unless named with --columns):
+
+    python sus_questionnaire.py export1.csv [export2.csv ...] [--columns Q1,Q2,...,Q10]
+'''
+
+ITEMS = 10
+# The odd items are positive statements, the even items negative ones
+SIGNS = np.array([1, -1] * (ITEMS // 2))
+OFFSETS = np.array([-1, 5] * (ITEMS // 2))
+# Every item contributes 0 to 4 points, the total is scaled to 0-100
+MAX_POINTS = 4 * ITEMS
+SCALE = 2.5
+CHUNK_SIZE = 10000
+
+
 def calculate_sus_score(items):
     if len(items) != 10:
         raise Exception
-    total_score = 0
-
-    for i, item in enumerate(items):
-        if i in {0,2,4,6}:
-            score = item - 1
-        else:
-            score = 5 - item
-        
-        total_score += score
-
-    total_score *= 2.5
-
-    return total_score
-
-# Evaluation 1
-
-# print(calculate_sus_score([5,1,5,2,3,3,5,1,3,1]))
-# print(calculate_sus_score([3,2,4,1,4,5,4,4,5,1]))
-# print(calculate_sus_score([3,1,4,4,1,4,1,4,1,1]))
-# print(calculate_sus_score([2,1,4,1,3,2,4,1,3,1]))
-
-# Evaluation 2
-responses = [[4,4,5,1,4,1,4,3,3,2], # Google Forms
-            [5,2,5,1,5,1,5,1,5,2], # Google Forms
-            [3,1,4,1,3,1,5,1,4,2], # Google Forms
-            [4,2,4,1,3,2,5,2,4,2], # Google Forms
-            [4,1,5,1,5,2,4,1,5,1], # Google Forms
-            [2,2,5,1,5,1,5,3,4,1], # Google Forms
-            [4,1,5,2,4,2,5,1,4,2], # Google Forms
-            [4,1,4,1,3,2,5,1,4,1], # pdf
-            [2,2,4,1,5,1,4,3,5,1], # Google Forms
-            [1,2,5,1,5,1,5,1,5,1], # Google Forms
-            [1,2,5,1,5,1,5,1,5,1]] # Google Forms
-
-print(f"{len(responses)} responses")
-
-cum_score = 0
-for response in responses:
-    sus_score = calculate_sus_score(response)
-    print(sus_score)
-
-    cum_score += sus_score
-
-cum_score /= len(responses)
-print(f"Average score: {cum_score}")
+    return float(sus_scores(validate(np.array([items])))[0])
+
+
+def validate(matrix: np.ndarray, strict: bool = True) -> np.ndarray:
+    """
+    Checks that every response has 10 whole answers between 1 and 5.
+
+    :param matrix (np.ndarray): The responses, one row per response.
+    :param strict (bool): Whether to raise on invalid responses instead of dropping them.
+
+    :return (np.ndarray): The valid responses as integers.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim != 2 or matrix.shape[1] != ITEMS:
+        raise ValueError(f"Expected responses of {ITEMS} items, got an array of shape {matrix.shape}.")
+
+    valid: np.ndarray = ((matrix >= 1) & (matrix <= 5) & (matrix == np.round(matrix))).all(axis=1)
+    if strict and not valid.all():
+        raise ValueError(f"Responses {np.flatnonzero(~valid)[:10].tolist()} have answers outside 1-5.")
+    return matrix[valid].astype(np.int8)
+
+
+def sus_points(matrix: np.ndarray) -> np.ndarray:
+    """
+    Calculates the unscaled score of every response.
+
+    :param matrix (np.ndarray): Valid responses, one row per response.
+
+    :return (np.ndarray): The points of every response, between 0 and 40.
+    """
+    return (matrix * SIGNS + OFFSETS).sum(axis=1)
+
+
+def sus_scores(matrix: np.ndarray) -> np.ndarray:
+    """
+    Calculates the SUS score of every response.
+
+    :param matrix (np.ndarray): Valid responses, one row per response.
+
+    :return (np.ndarray): The score of every response, between 0 and 100.
+    """
+    return sus_points(matrix) * SCALE
+
+
+def read_responses(csv_files: Iterable[str], columns: list[str] | None = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Streams the answers of csv exports in chunks, answers that are not numbers become NaN.
+
+    :param csv_files (Iterable): The csv files to read.
+    :param columns (list): The names of the 10 answer columns, the last 10 columns of every file if not provided.
+    :param chunk_size (int): The number of responses read at once.
+
+    :return (Iterator): The answers of every chunk, one row per response.
+    """
+    for csv_file in csv_files:
+        # Spreadsheet programs in Dutch locales export with semicolons
+        with open(csv_file) as f:
+            sep: str = ";" if ";" in f.readline() else ","
+        file_columns: list[str] = columns or pd.read_csv(csv_file, sep=sep, nrows=0).columns[-ITEMS:].tolist()
+
+        for chunk in pd.read_csv(csv_file, sep=sep, usecols=file_columns, chunksize=chunk_size):
+            yield chunk[file_columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+
+def bootstrap_mean(values: np.ndarray, counts: np.ndarray, samples: int = 10000, confidence: float = 0.95,
+                   seed: int | None = None) -> tuple[float, float]:
+    """
+    Calculates a percentile bootstrap confidence interval of a mean. Resampling n responses with replacement from
+    a few distinct values only changes how often every value is drawn, so every resample is drawn at once as counts
+    from a multinomial distribution, independent of the number of responses.
+
+    :param values (np.ndarray): The distinct values.
+    :param counts (np.ndarray): How often every value occurs.
+    :param samples (int): The number of resamples.
+    :param confidence (float): The confidence level of the interval.
+    :param seed (int): Seed of the random generator, for reproducible intervals.
+
+    :return (tuple): The lower and upper bound of the interval.
+    """
+    total: int = int(counts.sum())
+    if total == 0:
+        return float("nan"), float("nan")
+
+    resampled: np.ndarray = np.random.default_rng(seed).multinomial(total, counts / total, size=samples)
+    means: np.ndarray = resampled @ values / total
+    lower, upper = np.quantile(means, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return float(lower), float(upper)
+
+
+class SUSTally:
+    """
+    The SUSTally keeps the counts of the scores and answers of any number of responses, all statistics are
+    calculated from these counts.
+
+    :attr score_counts (np.ndarray): How many responses got every number of points, indexed by points (0-40).
+    :attr item_counts (np.ndarray): How often every answer (1-5) was given to every item, shape (10, 5).
+    :attr invalid (int): The number of responses that were dropped by validation.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty tally.
+
+        :return (None):
+        """
+        self.score_counts: np.ndarray = np.zeros(MAX_POINTS + 1, dtype=np.int64)
+        self.item_counts: np.ndarray = np.zeros((ITEMS, 5), dtype=np.int64)
+        self.invalid: int = 0
+
+    def add(self, matrix: np.ndarray) -> None:
+        """
+        Adds responses to the tally, invalid responses are counted and dropped.
+
+        :param matrix (np.ndarray): The responses, one row per response.
+
+        :return (None):
+        """
+        valid: np.ndarray = validate(matrix, strict=False)
+        self.invalid += len(matrix) - len(valid)
+
+        self.score_counts += np.bincount(sus_points(valid), minlength=MAX_POINTS + 1)
+        # Every (item, answer) pair gets its own bin
+        self.item_counts += np.bincount(((valid - 1) + 5 * np.arange(ITEMS)).ravel(),
+                                        minlength=ITEMS * 5).reshape(ITEMS, 5)
+
+    def __len__(self) -> int:
+        return int(self.score_counts.sum())
+
+    def scores(self) -> tuple[float, float]:
+        """
+        Calculates the mean and standard deviation of the SUS scores.
+
+        :return (tuple): The mean and the (sample) standard deviation, NaN when there are too few responses.
+        """
+        values: np.ndarray = np.arange(MAX_POINTS + 1) * SCALE
+        total: int = len(self)
+        if total == 0:
+            return float("nan"), float("nan")
+        mean: float = float(self.score_counts @ values / total)
+        variance: float = float(self.score_counts @ (values - mean) ** 2 / (total - 1)) if total > 1 else float("nan")
+        return mean, variance ** 0.5
+
+    def confidence_interval(self, samples: int = 10000, confidence: float = 0.95,
+                            seed: int | None = None) -> tuple[float, float]:
+        """
+        Calculates a bootstrap confidence interval of the mean SUS score, see bootstrap_mean().
+
+        :param samples (int): The number of resamples.
+        :param confidence (float): The confidence level of the interval.
+        :param seed (int): Seed of the random generator, for reproducible intervals.
+
+        :return (tuple): The lower and upper bound of the interval.
+        """
+        return bootstrap_mean(np.arange(MAX_POINTS + 1) * SCALE, self.score_counts, samples, confidence, seed)
+
+    def item_statistics(self) -> pd.DataFrame:
+        """
+        Calculates the statistics of every item.
+
+        :return (pd.DataFrame): The mean and standard deviation of the answers to every item, how often every answer
+        was given, and the mean points the item contributes to the (unscaled) score. The statistics that need more
+        responses than there are are NaN.
+        """
+        answers: np.ndarray = np.arange(1, 6)
+        totals: np.ndarray = self.item_counts.sum(axis=1)
+        # Only divide where there are enough responses, so empty tallies give NaN instead of warnings
+        means: np.ndarray = np.divide(self.item_counts @ answers, totals, out=np.full(ITEMS, np.nan), where=totals > 0)
+        variances: np.ndarray = np.divide((self.item_counts * (answers - means[:, None]) ** 2).sum(axis=1), totals - 1,
+                                          out=np.full(ITEMS, np.nan), where=totals > 1)
+
+        statistics: pd.DataFrame = pd.DataFrame(self.item_counts, columns=[f"answered_{answer}" for answer in answers],
+                                                index=pd.RangeIndex(1, ITEMS + 1, name="item"))
+        statistics.insert(0, "mean", means)
+        statistics.insert(1, "std", np.sqrt(variances))
+        statistics["points"] = means * SIGNS + OFFSETS
+        return statistics
+
+
+def score_exports(csv_files: Iterable[str], columns: list[str] | None = None) -> SUSTally:
+    """
+    Scores all responses of csv exports.
+
+    :param csv_files (Iterable): The csv files to read.
+    :param columns (list): The names of the 10 answer columns, the last 10 columns of every file if not provided.
+
+    :return (SUSTally): The tally of all valid responses.
+    """
+    tally = SUSTally()
+    for matrix in read_responses(csv_files, columns):
+        tally.add(matrix)
+    return tally
+
+
+if __name__ == '__main__' and len(sys.argv) > 1:
+    arguments: list[str] = sys.argv[1:]
+    answer_columns: list[str] | None = None
+    if "--columns" in arguments:
+        position: int = arguments.index("--columns")
+        answer_columns = arguments[position + 1].split(",")
+        del arguments[position:position + 2]
+
+    survey: SUSTally = score_exports(arguments, answer_columns)
+    if len(survey) == 0:
+        print(f"No valid responses to score ({survey.invalid} invalid responses dropped)")
+        sys.exit(1)
+
+    average, deviation = survey.scores()
+    low, high = survey.confidence_interval()
+    print(f"{len(survey)} responses ({survey.invalid} invalid responses dropped)")
+    print(f"Average score: {average:.1f} (sd {deviation:.1f}, 95% CI {low:.1f}-{high:.1f})")
+    print(survey.item_statistics().round(2).to_string())
+
+elif __name__ == '__main__':
+    # Evaluation 1
+
+    # print(calculate_sus_score([5,1,5,2,3,3,5,1,3,1]))
+    # print(calculate_sus_score([3,2,4,1,4,5,4,4,5,1]))
+    # print(calculate_sus_score([3,1,4,4,1,4,1,4,1,1]))
+    # print(calculate_sus_score([2,1,4,1,3,2,4,1,3,1]))
+
+    # Evaluation 2
+    responses = [[4,4,5,1,4,1,4,3,3,2], # Google Forms
+                [5,2,5,1,5,1,5,1,5,2], # Google Forms
+                [3,1,4,1,3,1,5,1,4,2], # Google Forms
+                [4,2,4,1,3,2,5,2,4,2], # Google Forms
+                [4,1,5,1,5,2,4,1,5,1], # Google Forms
+                [2,2,5,1,5,1,5,3,4,1], # Google Forms
+                [4,1,5,2,4,2,5,1,4,2], # Google Forms
+                [4,1,4,1,3,2,5,1,4,1], # pdf
+                [2,2,4,1,5,1,4,3,5,1], # Google Forms
+                [1,2,5,1,5,1,5,1,5,1], # Google Forms
+                [1,2,5,1,5,1,5,1,5,1]] # Google Forms
+
+    print(f"{len(responses)} responses")
+
+    cum_score = 0
+    for response in responses:
+        sus_score = calculate_sus_score(response)
+        print(sus_score)
+
+        cum_score += sus_score
+
+    cum_score /= len(responses)
+    print(f"Average score: {cum_score}")
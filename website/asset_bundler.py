@@ -0,0 +1,123 @@
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped, gzip is always available
+    brotli = None
+
+'''
+This file builds the static asset bundle served in production. Every asset in ASSETS is copied to the dist folder
+with a content hash in its name, next to a gzip and a brotli compressed variant, so it can be cached forever.
+References to the assets inside other assets and in game.html are rewritten to the hashed names. Run it from the
+repository root before serving or building the frontend image, the backend only serves the bundled page when
+SERVE_BUNDLE=1 is set:
+
+    python -m website.asset_bundler
+'''
+
+STATIC_FOLDER = "website/static"
+DIST_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+ENTRY_POINT = "game.html"
+
+# Assets relative to the static folder, in build order: files referencing other assets come after them
+ASSETS: list[str] = [
+    "styles.css",
+    "js_scripts/panolens.min.js",
+    "js_scripts/map_script.js",
+    "js_scripts/modal_script.js",
+    "js_scripts/script.js",
+]
+TEXT_EXTENSIONS = ('.js', '.css', '.html')
+
+
+def hashed_name(path: str, content: bytes) -> str:
+    """
+    Inserts the first characters of the content hash before the extension of a path.
+
+    :param path (str): The original relative path, e.g. js_scripts/script.js.
+    :param content (bytes): The content of the file.
+
+    :return (str): The hashed relative path, e.g. js_scripts/script.1a2b3c4d5e.js.
+    """
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{extension}"
+
+
+def rewrite_references(content: bytes, manifest: dict[str, str]) -> bytes:
+    """
+    Replaces the references to already bundled assets with their hashed paths.
+
+    :param content (bytes): The content of a text asset.
+    :param manifest (dict): The original relative paths mapped to the hashed ones.
+
+    :return (bytes): The rewritten content.
+    """
+    text: str = content.decode("utf-8")
+    for original, hashed in manifest.items():
+        text = text.replace(f"static/{original}", f"static/{DIST_NAME}/{hashed}")
+    return text.encode("utf-8")
+
+
+def write_variants(path: str, content: bytes) -> None:
+    """
+    Writes a file together with its precompressed variants.
+
+    :param path (str): The destination of the uncompressed file.
+    :param content (bytes): The content of the file.
+
+    :return (None):
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+    # A fixed mtime keeps the gzip output identical between builds
+    with open(f"{path}.gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        with open(f"{path}.br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def build_bundle(static_folder: str = STATIC_FOLDER) -> dict[str, str]:
+    """
+    Builds the dist folder: hashes, compresses and rewrites all assets and the entry point.
+
+    :param static_folder (str): The static folder of the website.
+
+    :return (dict): The original relative paths mapped to the hashed ones.
+    """
+    dist_folder: str = os.path.join(static_folder, DIST_NAME)
+    # Old hashed files are never referenced again, start from a clean folder
+    shutil.rmtree(dist_folder, ignore_errors=True)
+
+    manifest: dict[str, str] = {}
+    for asset in ASSETS:
+        with open(os.path.join(static_folder, asset), "rb") as f:
+            content: bytes = f.read()
+        if asset.endswith(TEXT_EXTENSIONS):
+            content = rewrite_references(content, manifest)
+
+        manifest[asset] = hashed_name(asset, content)
+        write_variants(os.path.join(dist_folder, manifest[asset]), content)
+        print(f"  Bundled: {asset} -> {manifest[asset]}")
+
+    # The entry point keeps its name, it is the only file that is revalidated by browsers
+    with open(os.path.join(static_folder, ENTRY_POINT), "rb") as f:
+        write_variants(os.path.join(dist_folder, ENTRY_POINT), rewrite_references(f.read(), manifest))
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    return manifest
+
+
+if __name__ == '__main__':
+    build_bundle(*sys.argv[1:2])
@@ -0,0 +1,70 @@
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+'''
+Small load generator used to compare serving setups, every simulated player starts a round and then makes a few
+moves. Run it against a running server:
+
+    python website/benchmark.py http://127.0.0.1:8000 [players] [moves]
+
+The results of the serving setups that were compared are listed in gunicorn.conf.py.
+'''
+
+
+def post(url: str, data: dict) -> dict:
+    """
+    Sends a JSON POST request to the game API.
+
+    :param url (str): The base url of the server.
+    :param data (dict): The request body.
+
+    :return (dict): The decoded JSON response.
+    """
+    request = Request(f"{url}/main", data=json.dumps(data).encode(), headers={"Content-Type": "application/json"})
+    with urlopen(request) as response:
+        return json.load(response)
+
+
+def play(url: str, moves: int) -> int:
+    """
+    Plays a round by always walking to the first neighbour offered.
+
+    :param url (str): The base url of the server.
+    :param moves (int): The number of moves to make.
+
+    :return (int): The number of requests made.
+    """
+    data: dict = post(url, {"type": "start"})
+    session: str = data["session"]
+    for _ in range(moves):
+        if not data["neighbours"]:
+            break
+        data = post(url, {"type": "neighbours", "session": session, "current": data["neighbours"][0][0]})
+    return moves + 1
+
+
+def benchmark(url: str, players: int = 200, moves: int = 10, concurrency: int = 32) -> float:
+    """
+    Plays many rounds concurrently and measures the throughput.
+
+    :param url (str): The base url of the server.
+    :param players (int): The number of rounds to play.
+    :param moves (int): The number of moves per round.
+    :param concurrency (int): The number of rounds played at the same time.
+
+    :return (float): The number of requests per second.
+    """
+    begin: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        total: int = sum(executor.map(lambda _: play(url, moves), range(players)))
+    return total / (time.perf_counter() - begin)
+
+
+if __name__ == '__main__':
+    arguments: list[str] = sys.argv[1:]
+    server_url: str = arguments[0] if arguments else "http://127.0.0.1:8000"
+    rps: float = benchmark(server_url, *(int(argument) for argument in arguments[1:3]))
+    print(f"{rps:.1f} requests/s")
@@ -2,11 +2,15 @@ from json import dump
 from geojson import FeatureCollection, Feature, load
 from networkx import adjacency_data, Graph, connected_components
 from collections import defaultdict
+from .quests import build_quest_chain, LANDMARKS_FILE
 
 '''
 This file should serve the one-time function of cleaning a geojson file and creating a new json file that can be used
 in the main program.
-The relevant data we want to keep in the json file will be necessary for creating the NetworkX graph and nothing else.
+The relevant data we want to keep in the json file will be necessary for creating the NetworkX graph and nothing else,
+apart from the precomputed routes of the landmark quests (see quests.py). Run it from the repository root:
+
+    python -m website.file_cleaner
 '''
 
 # Used in type hints to improve readability.
@@ -209,12 +213,13 @@ def geojson_converter(in_file_name: str) -> Graph:
     return graph
 
 
-def file_cleaner(in_file_name: str, out_file_name: str) -> None:
+def file_cleaner(in_file_name: str, out_file_name: str, landmarks_file: str | None = LANDMARKS_FILE) -> None:
     """
     Function to clean the geojson file and write the clean data to the provided json file name.
 
     :param in_file_name (str): The name of the file to be cleaned.
     :param out_file_name (str): The name of the file where the clean data should be written.
+    :param landmarks_file (str): The landmarks csv of the quest chain stored with the graph, None to store no quests.
 
     :return (None):
     """
@@ -235,6 +240,10 @@ def file_cleaner(in_file_name: str, out_file_name: str) -> None:
 
     final_graph: Graph = extract_main_component(main_graph)
 
+    # The quest routes are stored as graph data, so the server does not have to search them
+    if landmarks_file is not None:
+        final_graph.graph["quests"] = build_quest_chain(final_graph, landmarks_file)
+
     # Save the final graph data into json dictionary format
     new_json: dict[str, list] = adjacency_data(final_graph, attrs={'id': 'id', 'key': 'key'})
 
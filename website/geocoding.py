@@ -0,0 +1,178 @@
+import re
+import csv
+import json
+from typing import Iterable, Protocol
+from .rate_limit import TokenBucket
+from .json_files import write_json_atomic
+
+'''
+Batch geocoding with a persistent cache. Addresses are normalized and deduplicated before any lookup, results and
+misses are both cached on disk, and only addresses that were never looked up before reach the backend. The backend is
+pluggable, so an offline gazetteer (or a local stand-in server) can replace Nominatim.
+'''
+
+# Latitude and longitude
+Location = tuple[float, float]
+
+# Nominatim allows at most one request per second
+NOMINATIM_RATE = 1.0
+
+
+def normalize_address(address: str) -> str:
+    """
+    Builds the cache key of an address: lower case, without punctuation around words and single spaced.
+
+    :param address (str): The address as written in the data.
+
+    :return (str): The normalized address.
+    """
+    return " ".join(re.sub(r"[^\w\s-]", " ", address.lower()).split())
+
+
+class Backend(Protocol):
+    """
+    A geocoding service, returns the location of an address or None if it is unknown.
+    """
+
+    def geocode(self, address: str) -> Location | None:
+        ...
+
+
+class NominatimBackend:
+    """
+    Geocodes through the OpenStreetMap Nominatim service.
+    """
+
+    def __init__(self, user_agent: str, timeout: float = 10) -> None:
+        """
+        Initializes the geopy client, geopy is only needed when this backend is used.
+
+        :param user_agent (str): The application name Nominatim requires.
+        :param timeout (float): The number of seconds to wait for the server.
+
+        :return (None):
+        """
+        from geopy.geocoders import Nominatim
+
+        self._geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def geocode(self, address: str) -> Location | None:
+        """
+        Looks up a single address.
+
+        :param address (str): The address to look up.
+
+        :return (tuple): The location, or None if it was not found.
+        """
+        location = self._geolocator.geocode(address)
+        return (location.latitude, location.longitude) if location else None
+
+
+class GazetteerBackend:
+    """
+    Geocodes offline from a table of known addresses.
+    """
+
+    def __init__(self, entries: dict[str, Location]) -> None:
+        """
+        Initializes the gazetteer.
+
+        :param entries (dict): The addresses mapped to their location.
+
+        :return (None):
+        """
+        self._entries: dict[str, Location] = {normalize_address(address): location
+                                              for address, location in entries.items()}
+
+    @classmethod
+    def from_csv(cls, path: str) -> "GazetteerBackend":
+        """
+        Reads a gazetteer from a semicolon separated file with address, latitude and longitude columns.
+
+        :param path (str): The path of the file.
+
+        :return (GazetteerBackend): The gazetteer.
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls({row["address"]: (float(row["latitude"]), float(row["longitude"]))
+                        for row in csv.DictReader(f, delimiter=";")})
+
+    def geocode(self, address: str) -> Location | None:
+        """
+        Looks up a single address.
+
+        :param address (str): The address to look up.
+
+        :return (tuple): The location, or None if it is not in the gazetteer.
+        """
+        return self._entries.get(normalize_address(address))
+
+
+class BatchGeocoder:
+    """
+    The BatchGeocoder looks up many addresses through a backend, with a persistent cache and a rate limit.
+
+    :attr backend (Backend): The geocoding service.
+    :attr cache_file (str): The json file storing the results and misses of earlier lookups.
+    :attr cache (dict): The normalized addresses mapped to their location, or None for misses.
+    """
+
+    def __init__(self, backend: Backend, cache_file: str, limiter: TokenBucket | None = None) -> None:
+        """
+        Initializes the geocoder, reading the cache of earlier runs.
+
+        :param backend (Backend): The geocoding service.
+        :param cache_file (str): The json file storing the results and misses of earlier lookups.
+        :param limiter (TokenBucket): The rate limit of the backend, defaults to the Nominatim usage policy.
+
+        :return (None):
+        """
+        self.backend: Backend = backend
+        self.cache_file: str = cache_file
+        self._limiter: TokenBucket = limiter or TokenBucket(NOMINATIM_RATE)
+
+        try:
+            with open(cache_file) as f:
+                self.cache: dict[str, Location | None] = {key: tuple(value) if value else None
+                                                          for key, value in json.load(f).items()}
+        except FileNotFoundError:
+            self.cache: dict[str, Location | None] = {}
+
+    def geocode_all(self, addresses: Iterable[str]) -> dict[str, Location | None]:
+        """
+        Geocodes a batch of addresses, every distinct address is looked up at most once over all runs.
+        The cache is saved after every lookup, so an interrupted run loses nothing.
+
+        :param addresses (Iterable): The addresses to geocode, duplicates are allowed.
+
+        :return (dict): Every given address mapped to its location, or None if it could not be geocoded.
+        """
+        addresses = list(addresses)
+        # Deduplicate on the normalized address, keeping the first spelling for the lookup
+        queries: dict[str, str] = {}
+        for address in addresses:
+            queries.setdefault(normalize_address(address), address)
+
+        new: list[str] = [key for key in queries if key not in self.cache]
+        print(f"{len(queries)} distinct addresses, {len(new)} not in the cache.")
+
+        for key in new:
+            self._limiter.acquire()
+            try:
+                self.cache[key] = self.backend.geocode(queries[key])
+            except Exception as e:  # Errors are not cached, the address is retried on the next run
+                print(f"Error geocoding {queries[key]}: {e}")
+                continue
+            if self.cache[key] is None:
+                print(f"Could not geocode: {queries[key]}")
+            self.save_cache()
+
+        return {address: self.cache.get(normalize_address(address)) for address in addresses}
+
+    def save_cache(self) -> None:
+        """
+        Writes the cache to the cache file.
+
+        :return (None):
+        """
+        write_json_atomic(self.cache_file, self.cache, indent=1, ensure_ascii=False)
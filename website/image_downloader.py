@@ -0,0 +1,201 @@
+import os
+import json
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .rate_limit import TokenBucket
+from .json_files import write_json_atomic
+
+'''
+Reusable downloader for the images of a MediaWiki page. The image urls are looked up in batches, the files are
+downloaded concurrently through a pooled session and streamed to disk, and a manifest in the save folder records what
+was downloaded so that a rerun only fetches the files that are missing or changed on the wiki.
+'''
+
+MANIFEST_NAME = "manifest.json"
+# MediaWiki accepts at most 50 titles per query for normal users
+BATCH_SIZE = 50
+CHUNK_SIZE = 1 << 16
+
+
+class ImageDownloader:
+    """
+    The ImageDownloader downloads the images of a wiki page into a folder.
+
+    :attr api_url (str): The url of the MediaWiki api, e.g. https://nl.wikipedia.org/w/api.php.
+    :attr save_folder (str): The folder the images and the manifest are written to.
+    :attr workers (int): The maximum number of concurrent downloads.
+    :attr manifest (dict): The downloaded files, keyed by wiki file name.
+    """
+
+    def __init__(self, api_url: str, save_folder: str, headers: dict[str, str] | None = None, workers: int = 4,
+                 rate: float = 5.0, retries: int = 3, timeout: float = 30) -> None:
+        """
+        Initializes the downloader and its session, reading the manifest of earlier runs.
+
+        :param api_url (str): The url of the MediaWiki api.
+        :param save_folder (str): The folder the images and the manifest are written to.
+        :param headers (dict): Headers sent with every request, wikis require a descriptive User-Agent.
+        :param workers (int): The maximum number of concurrent downloads.
+        :param rate (float): The maximum number of requests per second.
+        :param retries (int): The number of retries of a failed request.
+        :param timeout (float): The number of seconds to wait for the server.
+
+        :return (None):
+        """
+        self.api_url: str = api_url
+        self.save_folder: str = save_folder
+        self.workers: int = workers
+        self.timeout: float = timeout
+
+        # One session shares the connections between all requests, retries back off on errors and rate limiting
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+        self.session: requests.Session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._limiter: TokenBucket = TokenBucket(rate)
+        self._lock: threading.Lock = threading.Lock()
+
+        os.makedirs(save_folder, exist_ok=True)
+        try:
+            with open(os.path.join(save_folder, MANIFEST_NAME)) as f:
+                self.manifest: dict[str, dict] = json.load(f)
+        except FileNotFoundError:
+            self.manifest: dict[str, dict] = {}
+
+    def _get_json(self, params: dict[str, str]) -> dict:
+        """
+        Calls the api.
+
+        :param params (dict): The query parameters.
+
+        :return (dict): The decoded response.
+        """
+        self._limiter.acquire()
+        response: requests.Response = self.session.get(self.api_url, params={**params, "format": "json"},
+                                                       timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def list_page_images(self, page_title: str) -> list[str]:
+        """
+        Gets the names of all the files used on a page.
+
+        :param page_title (str): The title of the page.
+
+        :return (list): The file names, in page order.
+        """
+        return self._get_json({"action": "parse", "page": page_title, "prop": "images"})["parse"]["images"]
+
+    def resolve(self, file_names: list[str]) -> dict[str, dict]:
+        """
+        Looks up the full-resolution url, size and hash of files, many files per api call.
+
+        :param file_names (list): The file names, without the File: prefix.
+
+        :return (dict): The image info of every file that exists, keyed by file name.
+        """
+        infos: dict[str, dict] = {}
+        for first in range(0, len(file_names), BATCH_SIZE):
+            batch: list[str] = file_names[first:first + BATCH_SIZE]
+            query: dict = self._get_json({"action": "query", "prop": "imageinfo", "iiprop": "url|size|sha1",
+                                          "titles": "|".join(f"File:{name}" for name in batch)})["query"]
+
+            # The api normalizes the titles (e.g. underscores to spaces), map them back to the requested names
+            requested: dict[str, str] = {f"File:{name}": name for name in batch}
+            for normalized in query.get("normalized", []):
+                requested[normalized["to"]] = requested.get(normalized["from"], normalized["from"])
+
+            for page in query["pages"].values():
+                if "imageinfo" in page and page["title"] in requested:
+                    infos[requested[page["title"]]] = page["imageinfo"][0]
+
+        return infos
+
+    def is_current(self, file_name: str, info: dict) -> bool:
+        """
+        Checks whether a file was downloaded before and has not changed since.
+
+        :param file_name (str): The wiki file name.
+        :param info (dict): The image info returned by resolve().
+
+        :return (bool): Whether the download can be skipped.
+        """
+        entry: dict | None = self.manifest.get(file_name)
+        if entry is None or entry["sha1"] != info["sha1"]:
+            return False
+        return os.path.exists(os.path.join(self.save_folder, entry["local"]))
+
+    def fetch(self, url: str, local_name: str) -> str:
+        """
+        Streams a file to disk. It is written under a temporary name first, so an interrupted download never looks
+        complete.
+
+        :param url (str): The url of the file.
+        :param local_name (str): The name of the file in the save folder.
+
+        :return (str): The SHA-1 hash of the downloaded content.
+        """
+        path: str = os.path.join(self.save_folder, local_name)
+        digest = hashlib.sha1()
+
+        self._limiter.acquire()
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(f"{path}.part", "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+
+        os.replace(f"{path}.part", path)
+        return digest.hexdigest()
+
+    def download(self, files: dict[str, str]) -> dict[str, dict]:
+        """
+        Downloads all files that are missing or changed, saving the manifest after every finished file so that an
+        interrupted run can be resumed.
+
+        :param files (dict): The wiki file names mapped to the names they get in the save folder.
+
+        :return (dict): The manifest.
+        """
+        infos: dict[str, dict] = self.resolve(list(files))
+        for file_name in files.keys() - infos.keys():
+            print(f"  ❌ Could not retrieve full-resolution URL: {file_name}")
+
+        todo: list[str] = [file_name for file_name in files
+                           if file_name in infos and not self.is_current(file_name, infos[file_name])]
+        print(f"{len(infos) - len(todo)} images up-to-date, {len(todo)} to download.")
+
+        def job(file_name: str) -> None:
+            info: dict = infos[file_name]
+            sha1: str = self.fetch(info["url"], files[file_name])
+            with self._lock:
+                self.manifest[file_name] = {"local": files[file_name], "url": info["url"],
+                                            "size": info["size"], "sha1": sha1}
+                self.save_manifest()
+            print(f"  ✔ Saved: {files[file_name]}")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(job, file_name) for file_name in todo]:
+                try:
+                    future.result()
+                except requests.RequestException as e:
+                    print(f"  Error: {e}")
+
+        return self.manifest
+
+    def save_manifest(self) -> None:
+        """
+        Writes the manifest of the downloaded files.
+
+        :return (None):
+        """
+        write_json_atomic(os.path.join(self.save_folder, MANIFEST_NAME), self.manifest, indent=1, sort_keys=True)
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from .json_files import write_json_atomic
+
+'''
+Content-addressed store for the poem images. Every distinct image is kept once, as a blob named after the SHA-256 of
+its content, and a manifest maps the poem ids (and the names of downloaded files) to blobs. Matching and renumbering
+images are edits of the manifest instead of renames on disk. Run it from the repository root:
+
+    python -m website.image_store migrate    (moves the poem image folders into the store)
+    python -m website.image_store check      (compares the stored poems with the poems csv)
+'''
+
+STORE_FOLDER = "website/static/image_store"
+BLOB_FOLDER = "blobs"
+MANIFEST_NAME = "manifest.json"
+POEMS_FILE = "website/static/csv_files/poems_geocoded.csv"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def file_hash(path: str) -> str:
+    """
+    Calculates the SHA-256 hash of a file, reading it in chunks.
+
+    :param path (str): The path of the file.
+
+    :return (str): The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_images(folder: str) -> list[str]:
+    """
+    Lists the image files in a folder.
+
+    :param folder (str): The folder to list.
+
+    :return (list): The paths of the images, sorted by name.
+    """
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(folder, name))]
+
+
+class ImageStore:
+    """
+    The ImageStore keeps one blob per distinct image and the manifest that names them.
+
+    :attr folder (str): The folder of the store.
+    :attr blobs (dict): The hash of every blob mapped to its extension and size.
+    :attr poems (dict): The poem ids mapped to the hash of their image.
+    :attr sources (dict): The names of ingested files mapped to the hash of their content.
+    """
+
+    def __init__(self, folder: str = STORE_FOLDER) -> None:
+        """
+        Opens a store, reading its manifest if it exists.
+
+        :param folder (str): The folder of the store.
+
+        :return (None):
+        """
+        self.folder: str = folder
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME)) as f:
+                manifest: dict[str, dict] = json.load(f)
+        except FileNotFoundError:
+            manifest: dict[str, dict] = {}
+
+        self.blobs: dict[str, dict[str, str | int]] = manifest.get("blobs", {})
+        self.poems: dict[str, str] = manifest.get("poems", {})
+        self.sources: dict[str, str] = manifest.get("sources", {})
+
+    def blob_path(self, blob_hash: str) -> str:
+        """
+        Gets the location of a blob, blobs are spread over sub folders named after the first characters of the hash.
+
+        :param blob_hash (str): The hash of the blob.
+
+        :return (str): The path of the blob, relative to the store folder.
+        """
+        return os.path.join(BLOB_FOLDER, blob_hash[:2], blob_hash + self.blobs[blob_hash]["extension"])
+
+    def poem_path(self, poem_id: str) -> str | None:
+        """
+        Gets the image of a poem.
+
+        :param poem_id (str): The id of the poem.
+
+        :return (str): The path of the image relative to the store folder, or None if the poem has no image.
+        """
+        blob_hash: str | None = self.poems.get(str(poem_id))
+        return self.blob_path(blob_hash) if blob_hash else None
+
+    def ingest(self, paths: list[str], workers: int = 8) -> dict[str, str]:
+        """
+        Adds files to the store. The files are hashed in parallel, and a blob is only created for content that is
+        not in the store yet. Blobs are hard links to the files when possible, so ingesting takes no extra space.
+
+        :param paths (list): The files to add.
+        :param workers (int): The number of files hashed at the same time.
+
+        :return (dict): The paths mapped to the hash of their content.
+        """
+        # Hashing mostly waits on the disk and releases the interpreter lock, so threads are enough
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hashes: dict[str, str] = dict(zip(paths, executor.map(file_hash, paths)))
+
+        for path, blob_hash in hashes.items():
+            if blob_hash not in self.blobs:
+                self.blobs[blob_hash] = {"extension": os.path.splitext(path)[1].lower(),
+                                         "bytes": os.path.getsize(path)}
+            blob: str = os.path.join(self.folder, self.blob_path(blob_hash))
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                try:
+                    os.link(path, blob)
+                except OSError:
+                    shutil.copy2(path, blob)
+
+        return hashes
+
+    def assign(self, poem_id: str, blob_hash: str) -> None:
+        """
+        Sets the image of a poem.
+
+        :param poem_id (str): The id of the poem.
+        :param blob_hash (str): The hash of the image.
+
+        :return (None):
+        """
+        if blob_hash not in self.blobs:
+            raise KeyError(f"The blob {blob_hash} is not in the store.")
+        self.poems[str(poem_id)] = blob_hash
+
+    def renumber(self, mapping: dict[str, str]) -> None:
+        """
+        Changes the ids of poems in one step, so ids can be swapped without temporary names.
+
+        :param mapping (dict): The old ids mapped to the new ids.
+
+        :return (None):
+        """
+        moved: dict[str, str] = {str(new): self.poems.pop(str(old)) for old, new in mapping.items()}
+        self.poems.update(moved)
+
+    def collect_garbage(self) -> list[str]:
+        """
+        Deletes the blobs that no poem or source refers to anymore.
+
+        :return (list): The hashes of the deleted blobs.
+        """
+        used: set[str] = set(self.poems.values()) | set(self.sources.values())
+        unused: list[str] = [blob_hash for blob_hash in self.blobs if blob_hash not in used]
+        for blob_hash in unused:
+            try:
+                os.remove(os.path.join(self.folder, self.blob_path(blob_hash)))
+            except FileNotFoundError:
+                pass
+            del self.blobs[blob_hash]
+        return unused
+
+    def save(self) -> None:
+        """
+        Writes the manifest.
+
+        :return (None):
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        write_json_atomic(os.path.join(self.folder, MANIFEST_NAME),
+                          {"blobs": self.blobs, "poems": self.poems, "sources": self.sources}, indent=1, sort_keys=True)
+
+    def check(self, poems_file: str = POEMS_FILE) -> tuple[list[str], list[str]]:
+        """
+        Compares the poems in the store with the poems csv.
+
+        :param poems_file (str): The csv containing the poems, with an id column.
+
+        :return (tuple): The ids of poems without an image, and the ids of images without a poem.
+        """
+        ids: set[str] = set(pd.read_csv(poems_file, sep=";", usecols=["id"], dtype=str)["id"])
+        return sorted(ids - self.poems.keys(), key=int), sorted(self.poems.keys() - ids, key=int)
+
+
+def migrate(store: ImageStore, poems_folder: str, raw_folder: str) -> None:
+    """
+    Moves the poem image folders into the store. Images in the poems folder are named after their poem id, the raw
+    downloads keep their name as source. The original files are removed, leaving a single copy of every image.
+
+    :param store (ImageStore): The store to fill.
+    :param poems_folder (str): The folder with the images named after their poem id.
+    :param raw_folder (str): The folder with the downloaded images.
+
+    :return (None):
+    """
+    for path, blob_hash in store.ingest(list_images(poems_folder)).items():
+        store.assign(os.path.splitext(os.path.basename(path))[0], blob_hash)
+    if os.path.isdir(raw_folder):
+        for path, blob_hash in store.ingest(list_images(raw_folder)).items():
+            store.sources[os.path.basename(path)] = blob_hash
+    store.save()
+
+    for folder in (poems_folder, raw_folder):
+        for path in list_images(folder) if os.path.isdir(folder) else []:
+            os.remove(path)
+
+    print(f"{len(store.poems)} poems and {len(store.sources)} sources stored in {len(store.blobs)} blobs.")
+
+
+if __name__ == '__main__':
+    image_store = ImageStore()
+    command: str = sys.argv[1] if len(sys.argv) > 1 else "check"
+
+    if command == "migrate":
+        migrate(image_store, "website/static/poem_images", "website/static/poem_images_raw")
+
+    missing, unknown = image_store.check()
+    print(f"Poems without an image: {missing}")
+    print(f"Images without a poem: {unknown}")
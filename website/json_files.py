@@ -0,0 +1,19 @@
+import os
+import json
+from typing import Any
+
+
+def write_json_atomic(path: str, data: Any, **options: Any) -> None:
+    """
+    Writes data to a json file through a temporary file that then replaces it, so a crash halfway through the write
+    never leaves a truncated file behind and readers see either the old or the new content.
+
+    :param path (str): The name/directory of the json file.
+    :param data (Any): The json serializable data.
+    :param options (Any): Formatting options passed on to json.dump(), e.g. indent or sort_keys.
+
+    :return (None):
+    """
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f, **options)
+    os.replace(f"{path}.tmp", path)
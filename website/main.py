@@ -1,47 +1,348 @@
 from .map import Map
+from .map_registry import MapRegistry
+from .round_pool import RoundPool, Round
+from .session import SessionStore, Session
+from .graph_workers import GraphWorkerPool
+from .image_derivatives import load_manifest, select_variant
+from .poi import POIStore, nearest_node, MAX_SNAP_DISTANCE
+from .quests import QuestChain
+from .image_store import ImageStore
+from .asset_bundler import MANIFEST_NAME, ENTRY_POINT
 # from map import Map
-from flask import Flask, request, jsonify, wrappers
+from flask import Flask, request, jsonify, wrappers, send_from_directory
 from flask_cors import CORS
+from werkzeug.utils import safe_join
+from typing import NamedTuple
+import mimetypes
 import os
 
 app = Flask(__name__, static_folder="static")
 CORS(app)
 
 
-# initialize the map object globally so that it can be used dynamically by the server, 
-# when static sends requests with updated player position
-# the second line is added for testing purposes and not needed for the actual server
-game = Map("website/map_graph.json")
+class MapServices(NamedTuple):
+    """
+    The services of a single map, built when the registry loads the map.
+
+    :attr rounds (RoundPool): The precomputed rounds of the map.
+    :attr poi (POIStore): The points of interest on the map.
+    :attr quests (QuestChain): The precomputed landmark quests of the map.
+    """
+    rounds: RoundPool
+    poi: POIStore
+    quests: QuestChain
+
+    def stop(self) -> None:
+        """
+        Stops the round producer when the map is evicted.
+
+        :return (None):
+        """
+        self.rounds.stop()
+
 
-def send_start(data: dict) -> wrappers.Response:
+def build_services(game: Map, spec: dict) -> MapServices:
+    """
+    Builds the services of a newly loaded map.
+
+    :param game (Map): The map.
+    :param spec (dict): The configuration of the map, see maps.json.
+
+    :return (MapServices): The round pool, points of interest and quests of the map.
+    """
+    # Points of interest, loaded once per map and queried around the player
+    poi = POIStore(game, os.path.join(app.static_folder, "csv_files"))
+    # The routes of the landmark quests are read from the graph file, or computed once if it has none
+    quests = QuestChain(game, os.path.join(app.static_folder, "csv_files", "main_landmarks.csv"))
+
+    # Rounds are generated ahead of time by a background thread, the pool size and refill rate can be tuned per deployment
+    # Players start at the configured start of the map and are sent to the first landmark, both are random otherwise
+    rounds = RoundPool(game,
+                       size=int(os.environ.get("ROUND_POOL_SIZE", 8)),
+                       refill_interval=float(os.environ.get("ROUND_POOL_REFILL_INTERVAL", 0)),
+                       fixed_start=nearest_node(game, spec["start"]) if "start" in spec else None,
+                       fixed_end=quests.legs[0]["target"] if len(quests) else None)
+    return MapServices(rounds, poi, quests)
+
+
+# The maps are loaded on first use and shared by all requests, the graphs used least recently are dropped when
+# they no longer fit the memory budget (MAP_MEMORY_BUDGET_MB, 0 for no limit)
+maps = MapRegistry(os.environ.get("MAP_CONFIG", "website/maps.json"),
+                   memory_budget=int(os.environ.get("MAP_MEMORY_BUDGET_MB", 0)) * 2 ** 20,
+                   services=build_services)
+# The default map is loaded at start up, so the first player does not wait for it
+maps.get()
+
+# The path of every player is tracked server side, so that moves can be validated
+sessions = SessionStore(max_sessions=int(os.environ.get("MAX_SESSIONS", 10000)))
+
+# Neighbour searches can be moved to worker processes (GRAPH_WORKERS > 0) so they do not block the request threads
+graph_workers = GraphWorkerPool(max_workers=int(os.environ.get("GRAPH_WORKERS", 0)), registry=maps)
+
+# Resized versions of the poem images, generated by image_derivatives.py
+POEM_IMAGES_DERIVED = os.path.join(app.static_folder, "poem_images_derived")
+poem_images: dict = load_manifest(POEM_IMAGES_DERIVED)
+# The full-resolution poem images, one blob per distinct image
+image_store = ImageStore(os.path.join(app.static_folder, "image_store"))
+
+# Hashed and precompressed assets, generated by asset_bundler.py. The bundle is not rebuilt when the sources change,
+# so the page only uses it when SERVE_BUNDLE is set (the Dockerfile does so after building it)
+DIST_FOLDER = os.path.join(app.static_folder, "dist")
+SERVE_BUNDLE: bool = os.environ.get("SERVE_BUNDLE", "0") == "1"
+
+def send_start(data: dict) -> tuple[wrappers.Response, int] | wrappers.Response:
     """
     Sends the start and end to the UI in a JSON file
     Keep tracks of the round to reset start and end when needed
+    The round is taken from the precomputed pool of the requested map, so no graph work is done on the request path
+
+    :param data (dict): The start request, with the id of the map to play on (the default map if not given).
 
     :return (JSON): The starting data required to initiate the game.
     """
-    game.game_init()
-    
-    return jsonify({"start": game.start, 
-                    "end": game.end, 
-                    "neighbours": game.get_neighbours_and_roads(game.start),
+    try:
+        services: MapServices = maps.services(data.get("map"))
+    except KeyError:
+        return jsonify({"error": "The map does not exist"}), 400
+    game: Map = services.rounds.game
+
+    current_round: Round = services.rounds.get()
+    game.start, game.end = current_round.start, current_round.end
+    session: Session = sessions.create(game, current_round)
+
+    return jsonify({"session": session.id,
+                    "map": game.map_id,
+                    "start": current_round.start,
+                    "end": current_round.end,
+                    "optimal_distance": current_round.optimal_distance,
+                    "neighbours": current_round.neighbours,
                     })
 
-def send_neighbours(data: dict[str]) -> wrappers.Response:
+def find_session(data: dict[str]) -> Session | None:
+    """
+    Looks up the session a request belongs to.
+
+    :param data (dict): The request, with the session token.
+
+    :return (Session): The session, or None if the token is missing, invalid or expired.
+    """
+    try:
+        return sessions.get(data["session"])
+    except (KeyError, TypeError):
+        return None
+
+def send_neighbours(data: dict[str]) -> tuple[wrappers.Response, int] | wrappers.Response:
     """
-    Calls generate neighbours and sends to the UI a JSON file with them.
+    Validates the move of the player, calls generate neighbours and sends to the UI a JSON file with them.
 
     :param data (dict): The current game data.
 
-    :return (JSON): The neighbours of the current node.
+    :return (JSON): The neighbours of the current node and the summary of the round so far.
+    """
+    session: Session | None = find_session(data)
+    if session is None:
+        return jsonify({"error": "The session does not exist or has expired"}), 400
+
+    # Overlapping requests of the same player would otherwise both be checked against the same offered neighbours
+    with session.lock:
+        try:
+            session.move(data["current"])
+        except (KeyError, TypeError):
+            return jsonify({"error": "The move needs the coordinates of a node"}), 400
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        neighbours: list = graph_workers.neighbours(session.game, session.position)
+        session.offer(neighbours)
+        summary: dict = session.summary()
+
+    return jsonify({"neighbours": neighbours, "summary": summary})
+
+
+def send_reset(data: dict[str]) -> tuple[wrappers.Response, int] | wrappers.Response:
+    """
+    Moves the player back to the start of the round, for the reset button of the UI.
+
+    :param data (dict): The session to reset.
+
+    :return (JSON): The neighbours of the start node and the summary of the restarted round.
+    """
+    session: Session | None = find_session(data)
+    if session is None:
+        return jsonify({"error": "The session does not exist or has expired"}), 400
+
+    with session.lock:
+        session.reset()
+        summary: dict = session.summary()
+
+    return jsonify({"neighbours": session.round.neighbours, "summary": summary})
+
+
+def send_quest(data: dict[str]) -> tuple[wrappers.Response, int] | wrappers.Response:
+    """
+    Sends the landmark quest the player is on, with its precomputed route. When the player reports the current quest
+    as completed while standing at (or within the snap radius of) its landmark, the session moves on to the next quest
+    first. Reporting the same quest twice only moves on once.
+
+    :param data (dict): The session and, optionally, the position of the completed quest in the chain.
+
+    :return (JSON): The quest, its target node and the route to it from the previous landmark.
     """
-    return jsonify({"neighbours": game.get_neighbours_and_roads(data["current"])})
+    session: Session | None = find_session(data)
+    if session is None:
+        return jsonify({"error": "The session does not exist or has expired"}), 400
+
+    quests: QuestChain = maps.services(session.game.map_id).quests
+    completed = data.get("completed")
+    with session.lock:
+        # A bool is an int as well, so True would complete the second quest
+        if type(completed) is int and completed == session.quest < len(quests) and Map.calculate_cartesian_distance(
+                session.position, quests.legs[completed]["target"]) <= MAX_SNAP_DISTANCE:
+            session.quest += 1
+            if session.quest < len(quests):
+                # The player is at the previous landmark, so the precomputed route of the leg applies
+                leg: dict = quests.leg(session.quest)
+                session.retarget(leg["target"], leg["distance"])
+        quest: dict = quests.leg(session.quest)
+
+    return jsonify(quest)
+
+
+def send_precompressed(filename: str, immutable: bool) -> wrappers.Response:
+    """
+    Sends a file from the asset bundle, using its brotli or gzip variant when the browser accepts it.
+
+    :param filename (str): The path of the file inside the bundle.
+    :param immutable (bool): Whether the file has a hashed name and may be cached forever.
+
+    :return (Response): The (compressed) file.
+    """
+    response: wrappers.Response | None = None
+    for encoding, extension in (("br", ".br"), ("gzip", ".gz")):
+        compressed: str | None = safe_join(DIST_FOLDER, filename + extension)
+        if request.accept_encodings[encoding] and compressed is not None and os.path.isfile(compressed):
+            # The type is the one of the original file, not of the compressed one
+            response = send_from_directory(DIST_FOLDER, filename + extension,
+                                           mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+            response.content_encoding = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(DIST_FOLDER, filename)
 
+    response.vary.add("Accept-Encoding")
+    if immutable:
+        response.cache_control.no_cache = False
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+
+    return response
 
 @app.route("/")
 def index():
+    # Serve the bundled page in production, the sources are served directly during development
+    if SERVE_BUNDLE:
+        return send_precompressed(ENTRY_POINT, immutable=False)
     return app.send_static_file("game.html")
 
+@app.route("/static/dist/<path:filename>")
+def dist(filename: str) -> wrappers.Response:
+    """
+    Serves the hashed assets of the bundle, these never change so they are cached forever. The page and the
+    manifest keep their names between builds, so they are revalidated instead.
+
+    :param filename (str): The path of the asset inside the bundle.
+
+    :return (Response): The (compressed) asset.
+    """
+    return send_precompressed(filename, immutable=filename not in (ENTRY_POINT, MANIFEST_NAME))
+
+@app.route("/poem_image/<image_id>")
+def poem_image(image_id: str) -> tuple[wrappers.Response, int] | wrappers.Response:
+    """
+    Serves the smallest resized version of a poem image that is at least as wide as requested.
+    Falls back to the original image if no derivatives were generated.
+
+    :param image_id (str): The id of the poem.
+
+    :return (Response): The image file.
+    """
+    entry: dict | None = poem_images.get(image_id)
+    if entry is None:
+        original: str | None = image_store.poem_path(image_id)
+        if original is None:
+            return jsonify({"error": "The poem has no image"}), 404
+        return send_from_directory(image_store.folder, original, max_age=86400)
+
+    # Only trust an explicit WebP entry, some browsers accept image/* without supporting WebP
+    file_name: str = select_variant(entry,
+                                    request.args.get("w", default=0, type=int),
+                                    "image/webp" in request.headers.get("Accept", ""))
+    response: wrappers.Response = send_from_directory(POEM_IMAGES_DERIVED, file_name, max_age=86400)
+    response.vary.add("Accept")
+
+    return response
+
+@app.route("/poi")
+def points_of_interest() -> tuple[wrappers.Response, int] | wrappers.Response:
+    """
+    Sends the markers of the points of interest around the player, either inside a bounding box
+    (south, west, north, east) or within a radius in metres of a position (lat, lng, radius).
+    The map is selected with the map argument, the default map if not given.
+
+    :return (JSON): The markers without their long texts, and the total number of points on the map.
+    """
+    try:
+        poi: POIStore = maps.services(request.args.get("map")).poi
+    except KeyError:
+        return jsonify({"error": "The map does not exist"}), 400
+
+    try:
+        if "radius" in request.args:
+            markers: list = poi.near(*(float(request.args[key]) for key in ("lat", "lng", "radius")))
+        else:
+            markers: list = poi.within(*(float(request.args[key]) for key in ("south", "west", "north", "east")))
+    except (KeyError, ValueError):
+        return jsonify({"error": "A bounding box or a position and radius is required"}), 400
+
+    response: wrappers.Response = jsonify({"markers": markers, "total": len(poi)})
+    response.cache_control.max_age = 3600
+
+    return response
+
+@app.route("/poi/<int:poi_id>")
+def point_of_interest(poi_id: int) -> tuple[wrappers.Response, int] | wrappers.Response:
+    """
+    Sends the full data of a point of interest, fetched when its marker is opened.
+    The map is selected with the map argument, the default map if not given.
+
+    :param poi_id (int): The id of the point.
+
+    :return (JSON): The data shown in the modal.
+    """
+    try:
+        response: wrappers.Response = jsonify(maps.services(request.args.get("map")).poi.details(poi_id))
+    except KeyError:
+        return jsonify({"error": "The map does not exist"}), 400
+    except IndexError as e:
+        return jsonify({"error": str(e)}), 404
+
+    response.cache_control.max_age = 3600
+
+    return response
+
+@app.route("/maps")
+def map_list() -> wrappers.Response:
+    """
+    Sends the maps that can be played.
+
+    :return (JSON): The id and title of every map, and the id of the default map.
+    """
+    return jsonify({"maps": maps.titles(), "default": maps.default})
+
 @app.route('/main', methods=['POST'])
 def main()-> tuple[wrappers.Response, int] | wrappers.Response:
     """
@@ -55,6 +356,10 @@ def main()-> tuple[wrappers.Response, int] | wrappers.Response:
         return send_start(data)
     elif data["type"] == "neighbours":
         return send_neighbours(data)
+    elif data["type"] == "reset":
+        return send_reset(data)
+    elif data["type"] == "quest":
+        return send_quest(data)
  
     
     return jsonify({"error" : "The data is not a JSON or the format is invalid"}), 400
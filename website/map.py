@@ -4,6 +4,7 @@ import random
 import matplotlib.pyplot as plt
 from queue import PriorityQueue
 from networkx import adjacency_graph
+from .render import render_graph
 
 # DataType short-hands for readability
 Node = tuple[float, float]
@@ -18,33 +19,46 @@ class Map:
     It is also able to process the player's inputs to change the player's position in real time using process_inputs().
 
     :attr serial (int): Random number to simulate game instance ID.
+    :attr graph_file (str): The cleaned json file the graph was read from.
+    :attr map_id (str): The id of the map in the map registry, None for a map created directly.
     :attr Graph (nx.Graph): Graph representing the current game map.
     :attr start (Node): Starting position of current round.
     :attr end (Node): Ending position of current round.
+    :attr nodes (list): All nodes of the graph, indexed by their compact id.
+    :attr node_ids (dict): The compact id of every node.
     """
 
-    def __init__(self, graph_file: str) -> None:
+    def __init__(self, graph_file: str, graph: nx.Graph | None = None, map_id: str | None = None) -> None:
         """
         Initializes the Map object, by giving it a random serial number and creating a graph to be used in the future.
         It also declares all the object variables that will be used in later methods.
 
         :param graph_file (str): The name/directory of a cleaned json file containing the graph info.
+        :param graph (nx.Graph): An already loaded graph (or a view of one) to share instead of reading graph_file.
+        :param map_id (str): The id of the map in the map registry, if it was created by one (see map_registry.py).
 
         :return (None):
         """
         # Random number chosen as the game serial number
         self.serial: int = random.randint(0, 200)
 
-        try:
-            self.Graph: nx.Graph = Map._create_graph(graph_file)
-        except Exception as e:
-            raise e
+        self.graph_file: str = graph_file
+        self.map_id: str | None = map_id
+        if graph is not None:
+            self.Graph: nx.Graph = graph
+        else:
+            try:
+                self.Graph: nx.Graph = Map._create_graph(graph_file)
+            except Exception as e:
+                raise e
 
         # Values declared and reset in the game initiation
         self.start: Node = (-1, -1)
         self.end: Node = (-1, -1)
 
-        self.history: dict[Node, tuple[Node, float]] = {}
+        # Compact integer ids for the nodes, player paths are stored as arrays of these ids (see session.py)
+        self.nodes: list[Node] = list(self.Graph.nodes)
+        self.node_ids: dict[Node, int] = {node: i for i, node in enumerate(self.nodes)}
 
     def game_init(self) -> None:
         """
@@ -125,6 +139,17 @@ class Map:
 
         raise Exception("An unknown error has occurred.")
 
+    def calculate_optimal_distance(self, start: Node, end: Node) -> float:
+        """
+        Calculates the length of the shortest route over the road network between two nodes.
+
+        :param start (Node): The starting node of the route.
+        :param end (Node): The ending node of the route.
+
+        :return (float): The summed road distance of the shortest route.
+        """
+        return nx.shortest_path_length(self.Graph, tuple(start), tuple(end), weight="dist")
+
     @staticmethod
     def clean_edge(edge: Road, start_node: Node) -> Road:
         """
@@ -203,6 +228,17 @@ class Map:
         """
         return ((node1[0] - node2[0]) ** 2 + (node1[1] - node2[1]) ** 2)**0.5
 
+    @staticmethod
+    def calculate_road_length(road: Road) -> float:
+        """
+        Calculates the length of a road by summing the cartesian distance between its consecutive points.
+
+        :param road (Road): The points along the road.
+
+        :return (float): The distance travelled when the road is taken.
+        """
+        return sum(Map.calculate_cartesian_distance(road[i], road[i + 1]) for i in range(len(road) - 1))
+
     def __repr__(self):
         """
         Default string representation.
@@ -216,19 +252,12 @@ class Map:
         """
         Visualizes a graph and highlights a particular path if provided.
 
+        :param graph (nx.Graph): The graph to visualize.
         :param path (Road): List of nodes representing the path to be highlighted.
 
         :return (None):
         """
 
-        pos = {node: node for node in graph.nodes()}  # Use node coordinates as positions
-        plt.figure(figsize=(10, 10))
-
-        # Draw the graph
-        nx.draw(graph, pos, with_labels=True, node_size=5, node_color='lightblue', font_size=1, font_weight='bold')
-
-        # Highlight the path if provided
-        if path:
-            path_edges = list(zip(path, path[1:]))
-            nx.draw_networkx_nodes(graph, pos, nodelist=path, node_color='green', node_size=8)
-            nx.draw_networkx_edges(graph, pos, edgelist=path_edges, edge_color='green', width=2)
+        # Draw the real road geometry in one go, see render.py for tiles and other options
+        _, ax = plt.subplots(figsize=(10, 10))
+        render_graph(graph, path, ax=ax)
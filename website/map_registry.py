@@ -0,0 +1,238 @@
+import os
+import json
+import threading
+import pandas as pd
+import networkx as nx
+from collections import OrderedDict
+from typing import Any, Callable
+from .map import Map
+
+'''
+The map registry serves several maps from one process. Every cleaned graph file is read once and shared by all the
+maps that use it, a map is a lightweight Map view on a shared graph, either the full graph or a subgraph: a district
+inside a bounding box (south, west, north, east) or a themed quest map around the landmarks of a csv. The graphs that
+were used least recently are dropped when the loaded graph files exceed the memory budget. The maps are configured in
+a json file:
+
+    {"default": "leiden",
+     "maps": {"leiden": {"title": "Leiden", "graph": "website/map_graph.json"},
+              "centrum": {"title": "Centrum", "graph": "website/map_graph.json",
+                          "bounds": [52.153, 4.477, 52.168, 4.5]},
+              "landmarks": {"title": "Landmark quest", "graph": "website/map_graph.json",
+                            "landmarks": "website/static/csv_files/main_landmarks.csv", "margin": 400}}}
+'''
+
+CONFIG_FILE = "website/maps.json"
+METRES_PER_DEGREE = 111320
+# A loaded graph takes several times the size of its json file in memory, this factor is used to estimate it
+MEMORY_PER_FILE_BYTE = 8
+
+
+def bounds_subgraph(graph: nx.Graph, bounds: tuple[float, float, float, float]) -> nx.Graph:
+    """
+    Creates a view of the part of a graph inside a bounding box, e.g. a district. Only the largest connected part is
+    kept, so every start and end can be reached.
+
+    :param graph (nx.Graph): The graph to take the part from.
+    :param bounds (tuple): The south, west, north and east edges of the box in degrees.
+
+    :return (nx.Graph): A read-only view sharing the data of the graph.
+    """
+    south, west, north, east = bounds
+    inside: nx.Graph = graph.subgraph(node for node in graph.nodes
+                                      if south <= node[0] <= north and west <= node[1] <= east)
+    if inside.number_of_nodes() == 0:
+        raise ValueError(f"The graph has no roads inside {list(bounds)}.")
+    return graph.subgraph(max(nx.connected_components(inside), key=len))
+
+
+def landmark_subgraph(graph: nx.Graph, landmarks_file: str, margin: float) -> nx.Graph:
+    """
+    Creates a view of the part of a graph around the landmarks of a csv, the bounding box of the landmarks is padded
+    by a margin. Only the largest connected part is kept, so every start and end can be reached.
+
+    :param graph (nx.Graph): The graph to take the part from.
+    :param landmarks_file (str): The csv containing the landmarks, with latitude and longitude columns.
+    :param margin (float): The padding in metres around the landmarks.
+
+    :return (nx.Graph): A read-only view sharing the data of the graph.
+    """
+    landmarks: pd.DataFrame = pd.read_csv(landmarks_file, sep=";", usecols=["latitude", "longitude"])
+    padding: float = margin / METRES_PER_DEGREE
+    return bounds_subgraph(graph, (landmarks["latitude"].min() - padding, landmarks["longitude"].min() - padding,
+                                   landmarks["latitude"].max() + padding, landmarks["longitude"].max() + padding))
+
+
+class MapRegistry:
+    """
+    The MapRegistry loads the configured maps on first use and keeps them, together with the services built for
+    them (e.g. the round pool), until their graph is evicted.
+
+    :attr default (str): The id of the map used when no map is requested.
+    :attr specs (dict): The configuration of every map id.
+    :attr memory_budget (int): The estimated number of bytes the loaded graphs may take, 0 for no limit.
+    """
+
+    def __init__(self, config_file: str = CONFIG_FILE, memory_budget: int = 0,
+                 services: Callable[[Map, dict], Any] | None = None) -> None:
+        """
+        Reads the configuration, the maps themselves are only loaded when they are requested.
+
+        :param config_file (str): The json file configuring the maps.
+        :param memory_budget (int): The estimated number of bytes the loaded graphs may take, 0 for no limit.
+        :param services (Callable): Builds the services of a newly loaded map from the map and its configuration,
+        their stop() is called on eviction.
+
+        :return (None):
+        """
+        with open(config_file) as f:
+            config: dict = json.load(f)
+
+        self.config_file: str = config_file
+        self.default: str = config["default"]
+        self.specs: dict[str, dict] = config["maps"]
+        self.memory_budget: int = memory_budget
+        if self.default not in self.specs:
+            raise ValueError(f"The default map {self.default} is not configured.")
+
+        self._services: Callable[[Map, dict], Any] | None = services
+        # Loaded graphs by file in order of use, and the loaded maps with their services by id
+        self._graphs: OrderedDict[str, nx.Graph] = OrderedDict()
+        self._maps: dict[str, tuple[Map, Any]] = {}
+        # Guards the dictionaries above, and is never held while a map is loaded or its services are stopped
+        self._lock: threading.Lock = threading.Lock()
+        # Held while a single map is loaded or a single graph file is read
+        self._map_locks: dict[str, threading.Lock] = {}
+        self._file_locks: dict[str, threading.Lock] = {}
+
+    def get(self, map_id: str | None = None) -> Map:
+        """
+        Gets a map, loading it if needed.
+
+        :param map_id (str): The id of the map, the default map if not provided.
+
+        :return (Map): The map.
+        """
+        return self._load(map_id)[0]
+
+    def services(self, map_id: str | None = None) -> Any:
+        """
+        Gets the services built for a map, loading the map if needed.
+
+        :param map_id (str): The id of the map, the default map if not provided.
+
+        :return (Any): The result of the services callable for the map.
+        """
+        return self._load(map_id)[1]
+
+    def titles(self) -> dict[str, str]:
+        """
+        Lists the configured maps, for the map selection of the UI.
+
+        :return (dict): The id of every map mapped to its title.
+        """
+        return {map_id: spec.get("title", map_id) for map_id, spec in self.specs.items()}
+
+    def loaded(self) -> list[str]:
+        """
+        Lists the maps that are currently loaded.
+
+        :return (list): The ids of the loaded maps.
+        """
+        with self._lock:
+            return list(self._maps)
+
+    def _load(self, map_id: str | None) -> tuple[Map, Any]:
+        """
+        Gets a map and its services, loading them and evicting the least recently used graphs if needed. The
+        registry lock is only held to look up and update the loaded maps, reading a graph and building the services
+        happen under a lock of their own, so requests for loaded maps never wait on the loading of another one.
+
+        :param map_id (str): The id of the map, the default map if not provided.
+
+        :return (tuple): The map and its services.
+        """
+        map_id = map_id or self.default
+        if map_id not in self.specs:
+            raise KeyError(f"The map {map_id} does not exist.")
+        spec: dict = self.specs[map_id]
+        graph_file: str = spec["graph"]
+
+        with self._lock:
+            if map_id in self._maps:
+                self._graphs.move_to_end(graph_file)
+                return self._maps[map_id]
+            map_lock: threading.Lock = self._map_locks.setdefault(map_id, threading.Lock())
+
+        # Concurrent requests for the same map wait for a single load
+        with map_lock:
+            with self._lock:
+                if map_id in self._maps:
+                    self._graphs.move_to_end(graph_file)
+                    return self._maps[map_id]
+
+            full_graph: nx.Graph = self._load_graph(graph_file)
+            graph: nx.Graph = full_graph
+            if "bounds" in spec:
+                graph = bounds_subgraph(full_graph, spec["bounds"])
+            elif "landmarks" in spec:
+                graph = landmark_subgraph(full_graph, spec["landmarks"], spec.get("margin", 400))
+            game: Map = Map(graph_file, graph=graph, map_id=map_id)
+            entry: tuple[Map, Any] = (game, self._services(game, spec) if self._services else None)
+
+            with self._lock:
+                # The graph may have been evicted while the services were built
+                self._graphs.setdefault(graph_file, full_graph)
+                self._graphs.move_to_end(graph_file)
+                self._maps[map_id] = entry
+                evicted: list[Any] = self._evict()
+
+        # Stopping waits for the round producers, which should not hold up other requests
+        for services in evicted:
+            if hasattr(services, "stop"):
+                services.stop()
+
+        return entry
+
+    def _load_graph(self, graph_file: str) -> nx.Graph:
+        """
+        Gets a loaded graph, reading the file if needed. Concurrent requests for the same file wait for a single read.
+
+        :param graph_file (str): The name/directory of the cleaned json file containing the graph info.
+
+        :return (nx.Graph): The graph.
+        """
+        with self._lock:
+            if graph_file in self._graphs:
+                return self._graphs[graph_file]
+            file_lock: threading.Lock = self._file_locks.setdefault(graph_file, threading.Lock())
+
+        with file_lock:
+            with self._lock:
+                if graph_file in self._graphs:
+                    return self._graphs[graph_file]
+
+            graph: nx.Graph = Map._create_graph(graph_file)
+
+            with self._lock:
+                self._graphs[graph_file] = graph
+            return graph
+
+    def _evict(self) -> list[Any]:
+        """
+        Drops the least recently used graphs, and the maps using them, until the estimated memory use fits the budget.
+        The graph used last is always kept. Sessions on an evicted map keep their own reference and can finish.
+        Must be called with the registry lock held.
+
+        :return (list): The services of the dropped maps, to be stopped once the lock is released.
+        """
+        evicted: list[Any] = []
+        if not self.memory_budget:
+            return evicted
+
+        while len(self._graphs) > 1 and sum(os.path.getsize(graph_file) * MEMORY_PER_FILE_BYTE
+                                            for graph_file in self._graphs) > self.memory_budget:
+            graph_file, _ = self._graphs.popitem(last=False)
+            for map_id in [map_id for map_id in self._maps if self.specs[map_id]["graph"] == graph_file]:
+                evicted.append(self._maps.pop(map_id)[1])
+        return evicted
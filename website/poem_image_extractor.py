@@ -1,84 +1,55 @@
 import os
-import requests
-import json
-from urllib.parse import quote
+from .image_downloader import ImageDownloader
+from .image_store import ImageStore
+
+'''
+Downloads the images of the Leiden wall poems list on Wikipedia and adds them to the image store as sources, ready to
+be matched to the poems. Rerunning it only downloads the images that are missing or changed. Run it from the
+repository root:
+
+    python -m website.poem_image_extractor
+'''
 
 PAGE_TITLE = "Lijst_van_muurgedichten_in_Leiden"
 SAVE_FOLDER = "website/static/poem_images_raw"
-
-os.makedirs(SAVE_FOLDER, exist_ok=True)
+API_URL = "https://nl.wikipedia.org/w/api.php"
 
 HEADERS = {
     "User-Agent": "LeidenPoemsImageDownloader/1.0 (nicolas.ramos.fernandez@gmail.com)"
 }
 
-# Step 1: Get page content + list of images
-print("Fetching image list...")
-
-images_url = (
-    "https://nl.wikipedia.org/w/api.php"
-    "?action=parse"
-    f"&page={quote(PAGE_TITLE)}"
-    "&prop=images"
-    "&format=json"
-)
-
-response = requests.get(images_url, headers=HEADERS)
-if response.status_code != 200:
-    print("Error fetching image list:", response.text)
-    exit(1)
-
-images_data = response.json()
-image_files = images_data["parse"]["images"]
-
-print(f"Found {len(image_files)} images on the page.")
-
-# Step 2: Get full-resolution URL for each image
-def get_fullres_url(filename):
-    api_url = (
-        "https://nl.wikipedia.org/w/api.php"
-        "?action=query"
-        "&format=json"
-        "&prop=imageinfo"
-        "&iiprop=url"
-        f"&titles=File:{quote(filename)}"
-    )
-    r = requests.get(api_url, headers=HEADERS)
-    if r.status_code != 200:
-        print("  Error:", r.text)
-        return None
 
-    data = r.json()
-    pages = data["query"]["pages"]
-    for _, page in pages.items():
-        if "imageinfo" in page:
-            return page["imageinfo"][0]["url"]
-    return None
+def local_names(image_files: list[str]) -> dict[str, str]:
+    """
+    Numbers the images in page order, the number prefix is used by poem_image_matcher.py.
 
-i=1
-# Step 3: Download each image
-for filename in image_files:
-    print(f"\nProcessing: {filename}")
-    extension = filename.split(".")[-1]
-    print(extension)
-    if extension == "svg" or extension == "webp": # We do not want the svg or webp images
-        continue
+    :param image_files (list): The file names on the page.
 
-    full_url = get_fullres_url(filename)
-    if not full_url:
-        print("  ❌ Could not retrieve full-resolution URL.")
-        continue
+    :return (dict): The file names mapped to their local names.
+    """
+    names: dict[str, str] = {}
+    for filename in image_files:
+        extension = filename.split(".")[-1]
+        if extension == "svg" or extension == "webp":  # We do not want the svg or webp images
+            continue
+        names[filename] = f"{len(names) + 1}_{filename.replace(' ', '_')}"
+    return names
 
-    img_data = requests.get(full_url, headers=HEADERS).content
 
-    local_name = str(i) + "_" + filename.replace(" ", "_")
-    save_path = os.path.join(SAVE_FOLDER, local_name)
+if __name__ == '__main__':
+    downloader = ImageDownloader(API_URL, SAVE_FOLDER, headers=HEADERS)
 
-    with open(save_path, "wb") as f:
-        f.write(img_data)
+    print("Fetching image list...")
+    image_files = downloader.list_page_images(PAGE_TITLE)
+    print(f"Found {len(image_files)} images on the page.")
 
-    print(f"  ✔ Saved: {save_path}")
+    manifest = downloader.download(local_names(image_files))
 
-    i += 1
+    # The store links the downloads instead of copying them, so they take no extra space
+    store = ImageStore()
+    downloaded = [os.path.join(SAVE_FOLDER, entry["local"]) for entry in manifest.values()]
+    for path, blob_hash in store.ingest(downloaded).items():
+        store.sources[os.path.basename(path)] = blob_hash
+    store.save()
 
-print("\nDone! All available images have been downloaded.")
\ No newline at end of file
+    print("\nDone! All available images have been downloaded.")
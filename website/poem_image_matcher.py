@@ -122,100 +122,107 @@
 
 # print("\nDone!")
 
-import os
 import sys
-import uuid
-
-IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
-
-def collect_files(directory):
-    files = []
-    for name in os.listdir(directory):
-        path = os.path.join(directory, name)
-        if os.path.isfile(path):
-            lower = name.lower()
-            if any(lower.endswith(ext) for ext in IMAGE_EXTENSIONS):
-                files.append(name)
-    return sorted(files, key=lambda s: int(s.split("_")[0]))
-
-def build_final_name(index, ext, padding):
-    if padding and padding > 0:
-        return f"{str(index).zfill(padding)}{ext}".lower()
+from .image_store import ImageStore
+
+'''
+Numbers the downloaded images in the order of their number prefix (see poem_image_extractor.py) and assigns them to
+poem ids in the image store. Only the images that have no poem yet are matched, to the poem ids that have no image
+yet, so the curated assignments are kept. Only the store manifest is edited, no file is renamed. Run it from the
+repository root, without --apply it only prints the planned assignments and the assignments they would change:
+
+    python -m website.poem_image_matcher [--apply] [--reassign]
+
+With --reassign every image is numbered again from 1, replacing the existing assignments.
+'''
+
+
+def download_order(name: str) -> tuple[int, int | str]:
+    """
+    Sort key of a downloaded file name. Names without a number prefix are sorted after the numbered ones instead of
+    breaking the matching.
+
+    :param name (str): The file name, e.g. 12_Some_poem.jpg.
+
+    :return (tuple): The sort key.
+    """
+    prefix: str = name.split("_")[0]
+    return (0, int(prefix)) if prefix.isdigit() else (1, name)
+
+
+def plan_matches(store: ImageStore, start: int = 1, reassign: bool = False) -> dict[str, str]:
+    """
+    Plans the poem ids of the downloaded images, in download order. The store is not changed.
+
+    :param store (ImageStore): The store containing the downloaded images as sources.
+    :param start (int): The first poem id.
+    :param reassign (bool): Whether to number every image from start, instead of only matching the images without a
+    poem to the free poem ids.
+
+    :return (dict): The source names mapped to their planned poem id.
+    """
+    assigned: set[str] = set(store.poems.values())
+    plan: dict[str, str] = {}
+    poem_id: int = start
+    for name in sorted(store.sources, key=download_order):
+        if not reassign and store.sources[name] in assigned:
+            continue
+        while not reassign and str(poem_id) in store.poems:
+            poem_id += 1
+        if download_order(name)[0]:
+            print(f"No number prefix, matched last: {name}", file=sys.stderr)
+        plan[name] = str(poem_id)
+        poem_id += 1
+    return plan
+
+
+def changed_assignments(store: ImageStore, plan: dict[str, str]) -> dict[str, tuple[str, str]]:
+    """
+    Finds the poems whose image would be replaced by a plan.
+
+    :param store (ImageStore): The store the plan is for.
+    :param plan (dict): The source names mapped to their planned poem id.
+
+    :return (dict): The poem ids mapped to the hash of their current image and of the planned one.
+    """
+    return {poem_id: (store.poems[poem_id], store.sources[name]) for name, poem_id in plan.items()
+            if poem_id in store.poems and store.poems[poem_id] != store.sources[name]}
+
+
+def apply_plan(store: ImageStore, plan: dict[str, str]) -> None:
+    """
+    Assigns the planned poem ids, the manifest still has to be saved.
+
+    :param store (ImageStore): The store the plan is for.
+    :param plan (dict): The source names mapped to their planned poem id.
+
+    :return (None):
+    """
+    for name, poem_id in plan.items():
+        store.assign(poem_id, store.sources[name])
+
+
+if __name__ == '__main__':
+    image_store = ImageStore()
+    if not image_store.sources:
+        print("No downloaded images in the image store, run the extractor and migrate first.", file=sys.stderr)
+        sys.exit(2)
+
+    arguments: list[str] = sys.argv[1:]
+    planned: dict[str, str] = plan_matches(image_store, reassign="--reassign" in arguments)
+    for source, planned_id in planned.items():
+        print(f"  {source} -> {planned_id}")
+
+    # Name the current images after their download where possible
+    source_names: dict[str, str] = {blob_hash: name for name, blob_hash in image_store.sources.items()}
+    changes: dict[str, tuple[str, str]] = changed_assignments(image_store, planned)
+    for planned_id, (old, new) in sorted(changes.items(), key=lambda change: int(change[0])):
+        print(f"  Poem {planned_id} changes: {source_names.get(old, old)} -> {source_names.get(new, new)}")
+
+    if "--apply" in arguments:
+        apply_plan(image_store, planned)
+        image_store.save()
+        print(f"Done. {len(planned)} images assigned, {len(changes)} existing assignments replaced.")
     else:
-        return f"{index}{ext}".lower()
-
-padding = 0
-dry_run = False
-
-directory = "website/static/poem_images"
-if not os.path.isdir(directory):
-    print(f"Directory not found: {directory}", file=sys.stderr)
-    sys.exit(2)
-
-files = collect_files(directory)
-
-total = len(files)
-start = 1
-last_index = start + total - 1
-
-actions = []
-# create mapping: orig -> temp -> final
-for i, fname in enumerate(files, start=start):
-    orig_path = os.path.join(directory, fname)
-    _, ext = os.path.splitext(fname)
-    if ext:
-        out_ext = '.' + ext.lstrip('.')
-    else:
-        out_ext = ext.lower() if ext else '.jpeg'
-    final_name = build_final_name(i, out_ext, padding)
-    final_path = os.path.join(directory, final_name)
-    # temp name: unique prefix + original name
-    temp_name = f"__tmp__{uuid.uuid4().hex}__{fname}"
-    temp_path = os.path.join(directory, temp_name)
-    actions.append((orig_path, temp_path, final_path))
-
-# Dry-run listing
-if dry_run:
-    print("Dry run - planned renames (orig -> final):")
-    for orig, temp, final in actions:
-        print(f"  {os.path.basename(orig)} -> {os.path.basename(final)}")
-else:
-
-    # Step 1: rename original -> temp (ensures no final collisions while iterating)
-    try:
-        for orig, temp, final in actions:
-            # Ensure orig still exists (skip if removed)
-            if not os.path.exists(orig):
-                print(f"Skipping missing file: {orig}")
-                continue
-            os.rename(orig, temp)
-            # print progress
-            print(f"Renamed to temp: {os.path.basename(orig)} -> {os.path.basename(temp)}")
-    except Exception as e:
-        print("Error during temp renaming:", e, file=sys.stderr)
-        print("Attempting to roll back (best-effort).")
-        # Attempt rollback: move any temp files back to original names when possible
-        for orig, temp, final in actions:
-            try:
-                if os.path.exists(temp) and not os.path.exists(orig):
-                    os.rename(temp, orig)
-            except Exception:
-                pass
-        raise
-
-    # Step 2: rename temp -> final
-    try:
-        for orig, temp, final in actions:
-            if not os.path.exists(temp):
-                print(f"Missing temp file (skipping): {temp}")
-                continue
-            if os.path.exists(final):
-                raise FileExistsError(f"Target file already exists: {final}")
-            os.rename(temp, final)
-            print(f"Renamed to final: {os.path.basename(final)}")
-    except Exception as e:
-        print("Error while writing final names:", e, file=sys.stderr)
-        print("Files already renamed to temporary names remain in the folder; you may want to inspect and fix them manually.")
-        raise
-
-    print(f"Done. {total} files renamed starting from {start} (padding={padding}).")
\ No newline at end of file
+        print(f"Dry run - {len(planned)} images would be assigned and {len(changes)} existing assignments replaced. "
+              f"The store was not changed, use --apply to save.")
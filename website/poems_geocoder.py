@@ -1,50 +1,48 @@
 import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
-import time
-
-# Load your CSV
-df = pd.read_csv("website/static/poems_raw.csv", sep=";", index_col=0)  # assumes column "address"
-
-# Initialize geocoder
-geolocator = Nominatim(user_agent="leiden_poems_map")
-geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1.5)  # respect usage limits
-
-# Create columns for lat/lon
-df["latitude"] = None
-df["longitude"] = None
-
-
-# Geocode each address
-for i, row in df.iterrows():
-    try:
-        if row["address_detail"] != "EMPTY":
-            address = f"{row['address']} {row['address_detail']}"
-        else:
-            address = row["address"]
-        # print(address)
-        location = geocode(address)
-        # print(location)
-        if location:
-            print((location.latitude, location.latitude))
-            df.at[i, "latitude"] = location.latitude
-            df.at[i, "longitude"] = location.longitude
-        else:
-            print(f"Could not geocode: {address}")
-            if row["address_detail"] != "EMPTY":
-                address = row["address"]
-                location = geocode(address)
-                # print(location)
-                if location:
-                    print((location.latitude, location.latitude))
-                    df.at[i, "latitude"] = location.latitude
-                    df.at[i, "longitude"] = location.longitude
-                else:
-                    print(f"Could not geocode: {address} simplified")
-    except Exception as e:
-        print(f"Error geocoding {address}: {e}")
-    time.sleep(1.2)  # be polite to the server
-
-# Save results
-df.to_csv("website/static/poems_geocoded.csv", sep=";")
-print("Geocoding complete!")
\ No newline at end of file
+from .geocoding import BatchGeocoder, NominatimBackend
+
+'''
+Adds the coordinates of every poem address to the poems csv. Results are cached in CACHE_FILE, so a rerun only
+looks up new addresses. Run it from the repository root:
+
+    python -m website.poems_geocoder
+'''
+
+RAW_FILE = "website/static/csv_files/poems_raw.csv"
+GEOCODED_FILE = "website/static/csv_files/poems_geocoded.csv"
+CACHE_FILE = "website/geocode_cache.json"
+
+
+def geocode_poems(df: pd.DataFrame, geocoder: BatchGeocoder) -> pd.DataFrame:
+    """
+    Geocodes the address of every poem, including the address detail when there is one. Addresses that cannot be
+    found with their detail are retried without it.
+
+    :param df (pd.DataFrame): The poems, with address and address_detail columns.
+    :param geocoder (BatchGeocoder): The geocoder to use.
+
+    :return (pd.DataFrame): The poems with latitude and longitude columns.
+    """
+    df = df.copy()
+    has_detail: pd.Series = df["address_detail"] != "EMPTY"
+    detailed: pd.Series = df["address"].where(~has_detail, df["address"] + " " + df["address_detail"])
+
+    locations: dict = geocoder.geocode_all(detailed)
+    # Retry the misses without their detail
+    misses: pd.Series = df["address"][detailed.map(locations).isna() & has_detail]
+    locations.update({address: location for address, location in geocoder.geocode_all(misses).items()
+                      if location is not None})
+
+    found: pd.Series = detailed.where(detailed.map(locations).notna(), df["address"]).map(locations)
+    df["latitude"] = found.map(lambda location: location[0] if isinstance(location, tuple) else None)
+    df["longitude"] = found.map(lambda location: location[1] if isinstance(location, tuple) else None)
+
+    return df
+
+
+if __name__ == '__main__':
+    poems = pd.read_csv(RAW_FILE, sep=";", index_col=0)
+    poems = geocode_poems(poems, BatchGeocoder(NominatimBackend(user_agent="leiden_poems_map"), CACHE_FILE))
+
+    poems.to_csv(GEOCODED_FILE, sep=";")
+    print("Geocoding complete!")
@@ -0,0 +1,211 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from .map import Map, Node
+
+'''
+The points of interest (poems, restaurants and landmarks) are loaded once from the csv files into column arrays.
+Every point is snapped to its nearest graph node and points that are not on the map are dropped, so that the UI only
+has to ask for the markers around the player and can fetch the long texts of a marker when it is opened.
+'''
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Kind of point mapped to its csv file, marker icon and modal style
+SOURCES: dict[str, tuple[str, str, str]] = {
+    "poem": ("poems_geocoded.csv", "poem_marker_icon", "box"),
+    "restaurant": ("restaurants.csv", "food_marker_icon", "box"),
+    "landmark": ("main_landmarks.csv", "end_marker_icon", "full"),
+}
+
+# Points further than this from any node (in degrees, roughly 200 metres) are not on the map
+MAX_SNAP_DISTANCE = 0.002
+METRES_PER_DEGREE = 111320
+# Number of points compared against all nodes at once while snapping, bounds the memory used
+SNAP_CHUNK = 64
+
+
+def snap_to_nodes(points: np.ndarray, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the nearest node of every point.
+
+    :param points (np.ndarray): Array of shape (P, 2) with the point coordinates.
+    :param nodes (np.ndarray): Array of shape (N, 2) with the node coordinates.
+
+    :return (tuple): The index of the nearest node and the distance to it, for every point.
+    """
+    nearest: np.ndarray = np.empty(len(points), dtype=np.int64)
+    distance: np.ndarray = np.empty(len(points))
+    for first in range(0, len(points), SNAP_CHUNK):
+        chunk: np.ndarray = points[first:first + SNAP_CHUNK]
+        squared: np.ndarray = ((chunk[:, None, :] - nodes[None, :, :]) ** 2).sum(axis=2)
+        nearest[first:first + SNAP_CHUNK] = squared.argmin(axis=1)
+        distance[first:first + SNAP_CHUNK] = np.sqrt(squared.min(axis=1))
+    return nearest, distance
+
+
+def nearest_node(game: Map, position: tuple[float, float]) -> Node | None:
+    """
+    Finds the node of a map nearest to a position.
+
+    :param game (Map): The map to search.
+    :param position (tuple): The latitude and longitude of the position.
+
+    :return (Node): The nearest node, or None if the position is not on the map.
+    """
+    nearest, distance = snap_to_nodes(np.array([position], dtype=float), np.array(game.nodes))
+    return game.nodes[nearest[0]] if distance[0] <= MAX_SNAP_DISTANCE else None
+
+
+def _poem_details(row: dict[str, str]) -> dict[str, str]:
+    """
+    Builds the modal data of a poem.
+
+    :param row (dict): The csv row of the poem.
+
+    :return (dict): The data shown when the marker is opened.
+    """
+    dutch_title: str = row["dutch_title"]
+    return {"title": row["original_title"] + (f" {dutch_title}" if dutch_title and dutch_title != "EMPTY" else ""),
+            "author": row["author"],
+            "placement_year": row["placement_year"],
+            "language": row["language"],
+            "image": f"poem_image/{row['id']}",
+            }
+
+
+def _place_details(row: dict[str, str]) -> dict[str, str]:
+    """
+    Builds the modal data of a restaurant or landmark, all columns are kept and the images get their path.
+
+    :param row (dict): The csv row of the place.
+
+    :return (dict): The data shown when the marker is opened.
+    """
+    details: dict[str, str] = {key: value for key, value in row.items() if key not in ("latitude", "longitude")}
+    for key in ("image", "image2", "image3"):
+        if details.get(key):
+            details[key] = f"static/images/{details[key]}"
+    return details
+
+
+class POIStore:
+    """
+    The POIStore holds all points of interest of a map as columns, with the long fields kept apart.
+
+    :attr game (Map): The map the points are snapped to.
+    :attr kind (np.ndarray): The kind of every point.
+    :attr latitude (np.ndarray): The latitude of every point.
+    :attr longitude (np.ndarray): The longitude of every point.
+    :attr node (np.ndarray): The compact id of the nearest node of every point.
+    :attr title (list): The short title of every point.
+    """
+
+    def __init__(self, game: Map, csv_folder: str) -> None:
+        """
+        Reads the csv files, snaps the points to the map and drops the points that are not on it.
+
+        :param game (Map): The map the points are snapped to.
+        :param csv_folder (str): The folder containing the csv files listed in SOURCES.
+
+        :return (None):
+        """
+        self.game: Map = game
+
+        kinds: list[str] = []
+        points: list[tuple[float, float]] = []
+        details: list[dict[str, str]] = []
+        for kind, (file_name, icon, style) in SOURCES.items():
+            frame: pd.DataFrame = pd.read_csv(os.path.join(csv_folder, file_name), sep=";", dtype=str,
+                                              keep_default_na=False)
+            latitudes: pd.Series = pd.to_numeric(frame["latitude"], errors="coerce")
+            longitudes: pd.Series = pd.to_numeric(frame["longitude"], errors="coerce")
+
+            for row, latitude, longitude in zip(frame.to_dict("records"), latitudes, longitudes):
+                row_details: dict[str, str] = _poem_details(row) if kind == "poem" else _place_details(row)
+                row_details.update({"kind": kind, "icon": icon, "style": style})
+                kinds.append(kind)
+                points.append((latitude, longitude))
+                details.append(row_details)
+
+        coordinates: np.ndarray = np.array(points, dtype=float).reshape(-1, 2)
+        nearest, distance = snap_to_nodes(np.nan_to_num(coordinates, nan=np.inf), np.array(game.nodes))
+        # Points without coordinates get an infinite distance and are dropped as well
+        keep: np.ndarray = np.isfinite(distance) & (distance <= MAX_SNAP_DISTANCE)
+
+        self.kind: np.ndarray = np.array(kinds)[keep]
+        self.latitude: np.ndarray = coordinates[keep, 0]
+        self.longitude: np.ndarray = coordinates[keep, 1]
+        self.node: np.ndarray = nearest[keep]
+        self._details: list[dict[str, str]] = [row for row, kept in zip(details, keep) if kept]
+        self.title: list[str] = [row.get("title", "") for row in self._details]
+
+        logger.info("%d points of interest loaded, %d dropped as not on the map.", len(self), int((~keep).sum()))
+
+    def __len__(self) -> int:
+        """
+        The number of points of interest on the map.
+
+        :return (int): The number of points.
+        """
+        return len(self._details)
+
+    def within(self, south: float, west: float, north: float, east: float) -> list[dict]:
+        """
+        Finds the points inside a bounding box.
+
+        :param south (float): The minimum latitude.
+        :param west (float): The minimum longitude.
+        :param north (float): The maximum latitude.
+        :param east (float): The maximum longitude.
+
+        :return (list): The markers of the points inside the box.
+        """
+        mask: np.ndarray = ((south <= self.latitude) & (self.latitude <= north)
+                            & (west <= self.longitude) & (self.longitude <= east))
+        return self._markers(np.flatnonzero(mask))
+
+    def near(self, latitude: float, longitude: float, radius: float) -> list[dict]:
+        """
+        Finds the points within a radius of a position.
+
+        :param latitude (float): The latitude of the position.
+        :param longitude (float): The longitude of the position.
+        :param radius (float): The radius in metres.
+
+        :return (list): The markers of the points inside the radius.
+        """
+        # Degrees of longitude get shorter away from the equator
+        d_latitude: np.ndarray = (self.latitude - latitude) * METRES_PER_DEGREE
+        d_longitude: np.ndarray = (self.longitude - longitude) * METRES_PER_DEGREE * np.cos(np.radians(latitude))
+        return self._markers(np.flatnonzero(d_latitude ** 2 + d_longitude ** 2 <= radius ** 2))
+
+    def details(self, poi_id: int) -> dict[str, str]:
+        """
+        Gets the full data of a point, including the long texts. Raises an IndexError if the point does not exist.
+
+        :param poi_id (int): The id of the point.
+
+        :return (dict): The data shown when the marker is opened.
+        """
+        if not 0 <= poi_id < len(self):
+            raise IndexError("The point of interest does not exist.")
+        return {"id": poi_id, **self._details[poi_id]}
+
+    def _markers(self, indices: np.ndarray) -> list[dict]:
+        """
+        Builds the lightweight marker data of points.
+
+        :param indices (np.ndarray): The ids of the points.
+
+        :return (list): The markers, without the long texts.
+        """
+        return [{"id": int(i),
+                 "kind": str(self.kind[i]),
+                 "coords": [float(self.latitude[i]), float(self.longitude[i])],
+                 "node": self.game.nodes[self.node[i]],
+                 "title": self.title[i],
+                 "icon": self._details[i]["icon"],
+                 "style": self._details[i]["style"],
+                 } for i in indices]
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+from .map import Map, Node, Road
+from .poi import snap_to_nodes, MAX_SNAP_DISTANCE
+
+'''
+The landmark quests form a chain: every landmark names the quest that ends there (questEnd), the quest that starts
+there (questStart) and the coordinates of the next landmark (newQuestLatitude/newQuestLongitude). The landmarks are
+snapped to their nearest graph node and the shortest road route of every leg is computed once, by file_cleaner.py
+when the graph is built (stored with the graph under "quests") or when a map without them is loaded.
+'''
+
+LANDMARKS_FILE = "website/static/csv_files/main_landmarks.csv"
+# A leg of the chain: the quest text, the landmark it leads to with its coordinates and node, and the route from the
+# previous landmark
+Leg = dict[str, str | Node | Road | float | None]
+
+
+def chain_order(landmarks: pd.DataFrame) -> list[int]:
+    """
+    Orders the landmarks by following the coordinates of the next quest, starting at the landmark no other landmark
+    leads to. Coordinates of (0, 0) end the chain.
+
+    :param landmarks (pd.DataFrame): The landmarks csv.
+
+    :return (list): The row positions of the landmarks in quest order.
+    """
+    positions: np.ndarray = landmarks[["latitude", "longitude"]].to_numpy(dtype=float)
+    following: np.ndarray = landmarks[["newQuestLatitude", "newQuestLongitude"]].to_numpy(dtype=float)
+
+    # The next quest coordinates are copied from the next landmark, so they match it exactly or very closely
+    next_landmark: list[int | None] = []
+    for point in following:
+        distance: np.ndarray = np.sqrt(((positions - point) ** 2).sum(axis=1))
+        next_landmark.append(int(distance.argmin()) if point.any() and distance.min() <= 1e-6 else None)
+
+    targeted: set[int] = {i for i in next_landmark if i is not None}
+    order: list[int] = []
+    current: int | None = next((i for i in range(len(landmarks)) if i not in targeted), 0 if len(landmarks) else None)
+    while current is not None and current not in order:
+        order.append(current)
+        current = next_landmark[current]
+    return order
+
+
+def build_quest_chain(graph: nx.Graph, landmarks_file: str = LANDMARKS_FILE) -> dict[str, list[Leg] | str]:
+    """
+    Snaps the landmarks to the graph and computes the route of every leg of the quest chain. The chain stops at the
+    first landmark that is not on the map.
+
+    :param graph (nx.Graph): The graph to build the chain on.
+    :param landmarks_file (str): The landmarks csv.
+
+    :return (dict): The legs in order, and the text shown when the chain is finished. Json serializable.
+    """
+    landmarks: pd.DataFrame = pd.read_csv(landmarks_file, sep=";", keep_default_na=False)
+    order: list[int] = chain_order(landmarks)
+
+    nodes: list[Node] = list(graph.nodes)
+    points: np.ndarray = landmarks[["latitude", "longitude"]].to_numpy(dtype=float)[order].reshape(-1, 2)
+    nearest, distance = snap_to_nodes(points, np.array(nodes, dtype=float).reshape(-1, 2))
+
+    legs: list[Leg] = []
+    finished: str = ""
+    for i, row in enumerate(landmarks.iloc[order].to_dict("records")):
+        if distance[i] > MAX_SNAP_DISTANCE:
+            break
+        target: Node = nodes[nearest[i]]
+        leg: Leg = {"quest": row["questEnd"], "title": row["title"], "coords": tuple(points[i].tolist()),
+                    "target": target, "route": None, "distance": None}
+        if legs:
+            # The first landmark is reached from wherever the round starts, so only the legs after it are fixed
+            leg["distance"], leg["route"] = nx.single_source_dijkstra(graph, legs[-1]["target"], target,
+                                                                      weight="dist")
+        legs.append(leg)
+        finished = row["questStart"]
+
+    return {"legs": legs, "finished": finished}
+
+
+def _leg_from_json(leg: Leg) -> Leg:
+    """
+    Copies a leg read from a json file, with its coordinates as tuples since tuples are not native json data types.
+
+    :param leg (dict): The leg as stored with the graph.
+
+    :return (dict): A new leg.
+    """
+    return {**leg,
+            "coords": tuple(leg["coords"]),
+            "target": tuple(leg["target"]),
+            "route": None if leg["route"] is None else [tuple(node) for node in leg["route"]],
+            }
+
+
+class QuestChain:
+    """
+    The QuestChain serves the precomputed legs of the landmark quests of a map.
+
+    :attr game (Map): The map the chain is on.
+    :attr legs (list): The legs in quest order, the first leads to the first landmark.
+    :attr finished (str): The text shown when the last landmark is reached.
+    """
+
+    def __init__(self, game: Map, landmarks_file: str = LANDMARKS_FILE) -> None:
+        """
+        Reads the chain stored with the graph, the chain is computed instead if the graph has none or it does not fit
+        the map (e.g. a map that is a part of the stored graph).
+
+        :param game (Map): The map the chain is on.
+        :param landmarks_file (str): The landmarks csv, used when the chain has to be computed.
+
+        :return (None):
+        """
+        self.game: Map = game
+
+        # The stored chain belongs to the graph, which is shared by every map on it, so it is converted into a copy
+        stored: dict | None = game.Graph.graph.get("quests")
+        chain: dict | None = None if stored is None else {"legs": [_leg_from_json(leg) for leg in stored["legs"]],
+                                                          "finished": stored["finished"]}
+        if chain is None or not all(leg["target"] in game.node_ids and all(node in game.node_ids
+                                                                           for node in leg["route"] or [])
+                                    for leg in chain["legs"]):
+            chain = build_quest_chain(game.Graph, landmarks_file)
+
+        self.legs: list[Leg] = chain["legs"]
+        self.finished: str = chain["finished"]
+
+    def __len__(self) -> int:
+        """
+        The number of legs of the chain.
+
+        :return (int): The number of legs.
+        """
+        return len(self.legs)
+
+    def leg(self, index: int) -> dict:
+        """
+        Gets a leg of the chain, as sent to the UI.
+
+        :param index (int): The position of the leg in the chain.
+
+        :return (dict): The leg, or the finished text once the chain is done.
+        """
+        if not 0 <= index < len(self.legs):
+            return {"index": len(self.legs), "quest": self.finished, "finished": True}
+        return {"index": index, **self.legs[index], "finished": False}
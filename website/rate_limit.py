@@ -0,0 +1,51 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter. Tokens are added at a constant rate up to the capacity, and every call
+    takes one, waiting only as long as needed instead of sleeping a fixed amount after every call.
+
+    :attr rate (float): The number of tokens added per second.
+    :attr capacity (float): The maximum number of tokens, i.e. the largest allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        """
+        Initializes a full bucket.
+
+        :param rate (float): The number of tokens added per second.
+        :param capacity (float): The maximum number of tokens, i.e. the largest allowed burst.
+
+        :return (None):
+        """
+        if rate <= 0:
+            raise ValueError("The rate must be positive.")
+        if capacity < 1:
+            raise ValueError("The capacity must allow at least one token.")
+
+        self.rate: float = rate
+        self.capacity: float = capacity
+
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Takes a token, blocking until one is available.
+
+        :return (None):
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Take the token now, a negative balance is the time the caller still has to wait
+            self._tokens -= 1
+            wait: float = -self._tokens / self.rate
+
+        if wait > 0:
+            time.sleep(wait)
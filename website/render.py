@@ -0,0 +1,160 @@
+import os
+import sys
+import math
+import numpy as np
+import networkx as nx
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+'''
+Fast rendering of the road network for debugging and admin views. All roads are drawn with their real geometry in a
+single line collection, and the full city can be written as pre-rendered map tiles (the standard z/x/y scheme).
+Writing the tiles of a cleaned graph, from the repository root:
+
+    python -m website.render website/map_graph.json <zoom> <out_folder>
+'''
+
+# DataType short-hands for readability
+Node = tuple[float, float]
+Road = list[Node]
+
+TILE_SIZE = 256
+ROAD_COLOUR = "#4a4a4a"
+PATH_COLOUR = "green"
+
+
+def road_lines(graph: nx.Graph) -> list[np.ndarray]:
+    """
+    Collects the geometry of every edge as an array of (longitude, latitude) points, i.e. (x, y).
+
+    :param graph (nx.Graph): The graph to draw.
+
+    :return (list): One array of shape (points, 2) per edge.
+    """
+    return [np.asarray(road, dtype=float)[:, ::-1] for _, _, road in graph.edges(data="road") if road]
+
+
+def path_line(graph: nx.Graph, path: Road) -> np.ndarray:
+    """
+    Builds the geometry of a path. Consecutive path nodes that are connected in the graph follow the road between
+    them instead of a straight line.
+
+    :param graph (nx.Graph): The graph the path is on.
+    :param path (Road): The nodes of the path.
+
+    :return (np.ndarray): Array of (longitude, latitude) points.
+    """
+    points: Road = [tuple(path[0])]
+    for current, following in zip(path, path[1:]):
+        current, following = tuple(current), tuple(following)
+        road: Road = graph.edges[current, following]["road"] if graph.has_edge(current, following) else []
+        if road:
+            # Roads are stored in either direction
+            points.extend(road[1:] if tuple(road[0]) == current else road[::-1][1:])
+        else:
+            points.append(following)
+    return np.asarray(points, dtype=float)[:, ::-1]
+
+
+def render_graph(graph: nx.Graph, path: Road | None = None, ax: Axes | None = None, labels: bool = False,
+                 figsize: tuple[float, float] = (10, 10)) -> Figure:
+    """
+    Draws all roads of a graph and highlights a path if provided.
+
+    :param graph (nx.Graph): The graph to draw.
+    :param path (Road): List of nodes representing the path to be highlighted.
+    :param ax (Axes): The axes to draw on, a new figure is created if not provided.
+    :param labels (bool): Whether to write the coordinates of every node, this is slow on large graphs.
+    :param figsize (tuple): The size in inches of a new figure.
+
+    :return (Figure): The figure drawn on.
+    """
+    if ax is None:
+        figure: Figure = Figure(figsize=figsize)
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+    figure = ax.figure
+
+    ax.add_collection(LineCollection(road_lines(graph), colors=ROAD_COLOUR, linewidths=0.6))
+    if path:
+        line: np.ndarray = path_line(graph, path)
+        ax.plot(line[:, 0], line[:, 1], color=PATH_COLOUR, linewidth=2)
+
+    if labels:
+        for latitude, longitude in graph.nodes:
+            ax.annotate(f"{latitude}, {longitude}", (longitude, latitude), fontsize=1)
+
+    # Degrees of longitude are shorter than degrees of latitude away from the equator
+    ax.autoscale()
+    latitudes: list[float] = [node[0] for node in graph.nodes]
+    if latitudes:
+        ax.set_aspect(1 / math.cos(math.radians(sum(latitudes) / len(latitudes))))
+
+    return figure
+
+
+def mercator_pixels(points: np.ndarray, zoom: int) -> np.ndarray:
+    """
+    Projects (longitude, latitude) points to web mercator pixel coordinates of a zoom level.
+
+    :param points (np.ndarray): Array of (longitude, latitude) points.
+    :param zoom (int): The zoom level.
+
+    :return (np.ndarray): Array of (x, y) pixel coordinates, y grows southwards.
+    """
+    scale: float = TILE_SIZE * 2 ** zoom
+    x: np.ndarray = (points[:, 0] + 180) / 360 * scale
+    latitude: np.ndarray = np.radians(points[:, 1])
+    y: np.ndarray = (1 - np.log(np.tan(latitude) + 1 / np.cos(latitude)) / math.pi) / 2 * scale
+    return np.column_stack((x, y))
+
+
+def render_tiles(graph: nx.Graph, zoom: int, out_folder: str, path: Road | None = None) -> int:
+    """
+    Writes transparent PNG tiles of the roads for one zoom level, as out_folder/zoom/x/y.png. The roads are
+    projected and added to the figure once, every tile only moves the view.
+
+    :param graph (nx.Graph): The graph to draw.
+    :param zoom (int): The zoom level.
+    :param out_folder (str): The folder the tiles are written to.
+    :param path (Road): List of nodes representing a path to be highlighted.
+
+    :return (int): The number of tiles written.
+    """
+    lines: list[np.ndarray] = [mercator_pixels(line, zoom) for line in road_lines(graph)]
+    if not lines:
+        return 0
+
+    figure: Figure = Figure(figsize=(1, 1), dpi=TILE_SIZE)
+    FigureCanvasAgg(figure)
+    ax: Axes = figure.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.add_collection(LineCollection(lines, colors=ROAD_COLOUR, linewidths=1))
+    if path:
+        line: np.ndarray = mercator_pixels(path_line(graph, path), zoom)
+        ax.plot(line[:, 0], line[:, 1], color=PATH_COLOUR, linewidth=2)
+
+    # Only the tiles that contain part of a road are written, a road segment can cross tiles without a point in them
+    tiles: set[tuple[int, int]] = set()
+    for line in lines:
+        corners: np.ndarray = (line // TILE_SIZE).astype(int)
+        lows: np.ndarray = np.minimum(corners[:-1], corners[1:])
+        highs: np.ndarray = np.maximum(corners[:-1], corners[1:])
+        for (x_low, y_low), (x_high, y_high) in zip(lows.tolist(), highs.tolist()):
+            tiles.update((x, y) for x in range(x_low, x_high + 1) for y in range(y_low, y_high + 1))
+    for x, y in sorted(tiles):
+        ax.set_xlim(x * TILE_SIZE, (x + 1) * TILE_SIZE)
+        ax.set_ylim((y + 1) * TILE_SIZE, y * TILE_SIZE)
+        os.makedirs(os.path.join(out_folder, str(zoom), str(x)), exist_ok=True)
+        figure.savefig(os.path.join(out_folder, str(zoom), str(x), f"{y}.png"), transparent=True)
+
+    return len(tiles)
+
+
+if __name__ == '__main__':
+    from .map import Map  # map.py uses this file for Map._visualize
+
+    graph_file, tile_zoom, tile_folder = sys.argv[1:4]
+    print(f"{render_tiles(Map._create_graph(graph_file), int(tile_zoom), tile_folder)} tiles written.")
@@ -0,0 +1,167 @@
+import random
+import threading
+from queue import Queue, Empty, Full
+from typing import NamedTuple
+from .map import Map, Node, Road
+
+
+class Round(NamedTuple):
+    """
+    A ready-made game round, containing everything the UI needs to start playing.
+
+    :attr start (Node): Starting position of the round.
+    :attr end (Node): Ending position of the round.
+    :attr optimal_distance (float): Length of the shortest road route from start to end.
+    :attr neighbours (list): The initial (neighbour, road_to_neighbour) payload for the start node.
+    """
+    start: Node
+    end: Node
+    optimal_distance: float
+    neighbours: list[tuple[Node, Road]]
+
+
+class RoundPool:
+    """
+    The RoundPool keeps a bounded queue of precomputed rounds for a single Map, refilled by a background thread.
+    Start requests take a round from the queue instead of generating one on the request path. When both the start and
+    the end are fixed every round is the same, so it is computed once and no thread is started.
+
+    :attr game (Map): The map the rounds are generated on.
+    :attr size (int): The maximum number of ready rounds kept in the pool.
+    :attr refill_interval (float): Seconds the producer waits between two generated rounds.
+    :attr fixed_start (Node): The start of every round, random if None.
+    :attr fixed_end (Node): The end of every round, random if None.
+    """
+
+    def __init__(self, game: Map, size: int = 8, refill_interval: float = 0.0, fixed_start: Node | None = None,
+                 fixed_end: Node | None = None) -> None:
+        """
+        Initializes the pool, the producer thread is only started on the first call to start() or get().
+
+        :param game (Map): The map the rounds are generated on.
+        :param size (int): The maximum number of ready rounds kept in the pool.
+        :param refill_interval (float): Seconds the producer waits between two generated rounds.
+        :param fixed_start (Node): The start of every round, random if None.
+        :param fixed_end (Node): The end of every round, random if None.
+
+        :return (None):
+        """
+        if size < 1:
+            raise ValueError("The round pool needs room for at least one round.")
+        if refill_interval < 0:
+            raise ValueError("Cannot have a negative refill interval.")
+
+        self.game: Map = game
+        self.size: int = size
+        self.refill_interval: float = refill_interval
+        self.fixed_start: Node | None = fixed_start
+        self.fixed_end: Node | None = fixed_end
+
+        self._rounds: Queue[Round] = Queue(maxsize=size)
+        self._stop: threading.Event = threading.Event()
+        self._producer: threading.Thread | None = None
+        self._lock: threading.Lock = threading.Lock()
+        # The only round there is when both the start and the end are fixed, computed on first use
+        self._fixed_round: Round | None = None
+
+    def generate_round(self) -> Round:
+        """
+        Generates a single round synchronously.
+
+        :return (Round): A new round with the fixed or random start and end nodes.
+        """
+        if self.fixed_start is None and self.fixed_end is None:
+            start, end = self.game.generate_start_end()
+        else:
+            start, end = self.fixed_start or self._random_node(self.fixed_end), \
+                self.fixed_end or self._random_node(self.fixed_start)
+        return Round(start, end,
+                     self.game.calculate_optimal_distance(start, end),
+                     self.game.get_neighbours_and_roads(start))
+
+    def _random_node(self, other: Node | None) -> Node:
+        """
+        Picks the random end of a round of which the other end is fixed.
+
+        :param other (Node): The fixed end of the round.
+
+        :return (Node): A random node of the map that is not the fixed end.
+        """
+        while True:
+            node: Node = random.choice(self.game.nodes)
+            if node != other:
+                return node
+
+    def start(self) -> None:
+        """
+        Starts the producer thread if it is not running. Threads do not survive a fork, so this is also what
+        restarts the producer inside forked server workers.
+
+        :return (None):
+        """
+        with self._lock:
+            if self.fixed_start is not None and self.fixed_end is not None:
+                return
+            if self._producer is not None and self._producer.is_alive():
+                return
+            self._stop.clear()
+            self._producer = threading.Thread(target=self._produce, name="round-pool", daemon=True)
+            self._producer.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Signals the producer thread to stop and waits for it to finish.
+
+        :param timeout (float): The maximum number of seconds to wait for the producer.
+
+        :return (None):
+        """
+        self._stop.set()
+        if self._producer is not None:
+            self._producer.join(timeout)
+
+    def get(self) -> Round:
+        """
+        Takes a ready round from the pool. If the pool is empty (cold start or bursts of requests) a round is
+        generated on the spot so that the request never fails.
+
+        :return (Round): A round that has not been handed out before, or the only round when both ends are fixed.
+        """
+        if self.fixed_start is not None and self.fixed_end is not None:
+            with self._lock:
+                if self._fixed_round is None:
+                    self._fixed_round = self.generate_round()
+            return self._fixed_round
+
+        self.start()
+        try:
+            return self._rounds.get_nowait()
+        except Empty:
+            return self.generate_round()
+
+    def __len__(self) -> int:
+        """
+        The number of rounds currently ready in the pool.
+
+        :return (int): The approximate size of the queue.
+        """
+        return self._rounds.qsize()
+
+    def _produce(self) -> None:
+        """
+        Producer loop, keeps the pool filled until stop() is called. Put blocks while the pool is full, the timeout
+        only exists so the stop signal is noticed.
+
+        :return (None):
+        """
+        while not self._stop.is_set():
+            new_round: Round = self.generate_round()
+            while not self._stop.is_set():
+                try:
+                    self._rounds.put(new_round, timeout=0.5)
+                    break
+                except Full:
+                    continue
+
+            if self.refill_interval:
+                self._stop.wait(self.refill_interval)
@@ -0,0 +1,190 @@
+import secrets
+import threading
+from array import array
+from collections import OrderedDict
+from .map import Map, Node, Road
+from .round_pool import Round
+
+
+class Session:
+    """
+    The Session class tracks the path of a single player during a round. The path is stored as an array of compact
+    node ids, and every claimed move is checked against the neighbours that were last sent to the player.
+
+    :attr id (str): Random token identifying the session.
+    :attr game (Map): The map the round is played on.
+    :attr round (Round): The round the player is playing.
+    :attr path (array): The compact ids of every node the player has visited, in order.
+    :attr walked (float): The total road distance the player has travelled.
+    :attr target (Node): The node the player is sent to, the end of the round or the landmark of the current quest.
+    :attr optimal_distance (float): Length of the shortest road route to the target from where it was set.
+    :attr quest (int): The position in the landmark quest chain of the quest the player is on (see quests.py).
+    :attr lock (threading.Lock): Held by a request from validating a move until the new neighbours are offered, so
+    overlapping requests of one player are handled one after the other.
+    """
+
+    def __init__(self, session_id: str, game: Map, current_round: Round) -> None:
+        """
+        Initializes the session at the start node of the round and offers the neighbours of that node.
+
+        :param session_id (str): Random token identifying the session.
+        :param game (Map): The map the round is played on.
+        :param current_round (Round): The round the player is playing.
+
+        :return (None):
+        """
+        self.id: str = session_id
+        self.game: Map = game
+        self.round: Round = current_round
+
+        self.path: array = array("I", [game.node_ids[tuple(current_round.start)]])
+        self.walked: float = 0.0
+        self.quest: int = 0
+
+        self.target: Node = tuple(current_round.end)
+        self.optimal_distance: float = current_round.optimal_distance
+        # The moves and distance walked before the current target was set, the summary only counts those after it
+        self._target_moves: int = 0
+        self._target_walked: float = 0.0
+
+        # Ids of the neighbours sent in the last response, with the length of the road leading to them
+        self._offered: dict[int, float] = {}
+        self.offer(current_round.neighbours)
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def position(self) -> Node:
+        """
+        The node the player is currently standing on.
+
+        :return (Node): The last node of the path.
+        """
+        return self.game.nodes[self.path[-1]]
+
+    def offer(self, neighbours: list[tuple[Node, Road]]) -> None:
+        """
+        Remembers the neighbours sent to the player, these are the only valid destinations of the next move.
+
+        :param neighbours (list): List of tuples containing (neighbour, road_to_neighbour).
+
+        :return (None):
+        """
+        self._offered = {self.game.node_ids[tuple(neighbour)]: Map.calculate_road_length(road)
+                         for neighbour, road in neighbours}
+
+    def move(self, node: Node) -> None:
+        """
+        Validates a move claimed by the player and adds it to the path. Requesting the current position again is
+        allowed (e.g. a page reload) and does not count as a move. The offered neighbours belong to the previous
+        position, so no further move is accepted until the neighbours of the new position are offered.
+
+        :param node (Node): The node the player claims to have moved to.
+
+        :return (None):
+        """
+        node_id: int | None = self.game.node_ids.get(tuple(node))
+        if node_id is None:
+            raise ValueError("The node is not part of the map.")
+        if node_id == self.path[-1]:
+            return
+        if node_id not in self._offered:
+            raise ValueError("The node cannot be reached from the current position.")
+
+        self.path.append(node_id)
+        self.walked += self._offered[node_id]
+        self._offered = {}
+
+    def reset(self) -> None:
+        """
+        Moves the player back to the start of the round, forgetting the path walked and the quests completed so far.
+
+        :return (None):
+        """
+        del self.path[1:]
+        self.walked = 0.0
+        self.quest = 0
+        self.retarget(self.round.end, self.round.optimal_distance)
+        self.offer(self.round.neighbours)
+
+    def retarget(self, target: Node, optimal_distance: float) -> None:
+        """
+        Sends the player to a new target from their current position, e.g. the landmark of the next quest.
+
+        :param target (Node): The node the player is sent to.
+        :param optimal_distance (float): Length of the shortest road route from the current position to the target.
+
+        :return (None):
+        """
+        self.target = tuple(target)
+        self.optimal_distance = optimal_distance
+        self._target_moves = len(self.path) - 1
+        self._target_walked = self.walked
+
+    def summary(self) -> dict[str, float | int | bool]:
+        """
+        Summarizes the way to the current target so far, comparing the walked distance with the optimal one.
+
+        :return (dict): The statistics since the target was set.
+        """
+        return {"moves": len(self.path) - 1 - self._target_moves,
+                "walked_distance": self.walked - self._target_walked,
+                "optimal_distance": self.optimal_distance,
+                "finished": self.position == self.target,
+                }
+
+
+class SessionStore:
+    """
+    The SessionStore keeps the active sessions in memory. When it is full the least recently used session is dropped.
+
+    :attr max_sessions (int): The maximum number of sessions kept at once.
+    """
+
+    def __init__(self, max_sessions: int = 10000) -> None:
+        """
+        Initializes an empty store.
+
+        :param max_sessions (int): The maximum number of sessions kept at once.
+
+        :return (None):
+        """
+        self.max_sessions: int = max_sessions
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def create(self, game: Map, current_round: Round) -> Session:
+        """
+        Creates and stores a session for a new round.
+
+        :param game (Map): The map the round is played on.
+        :param current_round (Round): The round the player is playing.
+
+        :return (Session): The new session.
+        """
+        session: Session = Session(secrets.token_urlsafe(16), game, current_round)
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """
+        Gets an active session, raises a KeyError if it does not exist (anymore).
+
+        :param session_id (str): The token identifying the session.
+
+        :return (Session): The requested session.
+        """
+        with self._lock:
+            self._sessions.move_to_end(session_id)
+            return self._sessions[session_id]
+
+    def __len__(self) -> int:
+        """
+        The number of active sessions.
+
+        :return (int): The number of sessions in the store.
+        """
+        return len(self._sessions)
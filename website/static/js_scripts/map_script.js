@@ -245,8 +245,8 @@ function checkMarkerDistances() {
                     animatePlaceMarker(markerDatum);
                     placedMarkersCoords.add(markerDatum.coords);  
                     numPlacedMarkers += 1
-                    console.log("Current progress: " + numPlacedMarkers + "/" + markerData.length)
-                    showBar(numPlacedMarkers / markerData.length * 100)                  
+                    console.log("Current progress: " + numPlacedMarkers + "/" + totalMarkers)
+                    showBar(numPlacedMarkers / totalMarkers * 100)                  
                 }
                 // marker._data.push()
             });
@@ -287,7 +287,7 @@ function animatePlaceMarker(markerDatum, finalIconSize = [32, 40], mapInstance =
     const marker = L.marker(markerDatum.coords, { icon }).addTo(mapInstance);
 
     marker._data = markerDatum; // store data for modal use
-    marker.on('click', () => openModal(markerDatum));
+    marker.on('click', async () => openModal(await loadMarkerDetails(markerDatum)));
 
     // Ensure the element is in DOM and initial styles are rendered.
     // Use double requestAnimationFrame to guarantee a separate frame.
@@ -21,13 +21,20 @@ if (resetButton) resetButton.onclick = resetGame;
 let neighbours;
 let end;
 let start;
+let sessionId;
+// The map to play on can be chosen with ?map=<id> in the page url, the server picks its default map otherwise
+let mapId = new URLSearchParams(window.location.search).get("map");
 
 let quests = [];
+// Position in the landmark quest chain of the current quest, as tracked by the server
+let questIndex = 0;
 let questsSet = new Set();
 
 // Initialization of the constant game variables, the elements from the html
 const questLog = document.querySelector('#questLog');
 const infoOverlay = document.querySelector('#infoOverlay');
+// Width in device pixels at which poem images are shown in the modal
+const POEM_IMAGE_WIDTH = Math.round(Math.min(window.innerWidth, 640) * (window.devicePixelRatio || 1));
 
 
 // Geting the information thorugh Flask
@@ -37,7 +44,7 @@ async function initializeFlask() {
     // This function fetches the data from the server by sending a POST request to the server and returns it
     // This fetch is of the type start, and gets the data for drawing the map
 
-    const start = {"type": "start"}
+    const start = {"type": "start", "map": mapId}
     try{
         // const response = await fetch('http://127.0.0.1:10000/main',{
         const response = await fetch('/main',{
@@ -65,7 +72,8 @@ async function requestNeighbours(coords) {
     // This function works as the initialize flask function, but is of the type neighbours
     // It sends the current coordinates and gets the adjacent coordinates (neighbours)
 
-    const send_neighbours = {"type": "neighbours", "current": coords}
+    // The session id lets the server validate the move against the neighbours it sent before
+    const send_neighbours = {"type": "neighbours", "session": sessionId, "current": coords}
     try{
         // const response = await fetch('http://127.0.0.1:10000/main',{
         const response = await fetch('/main',{
@@ -84,17 +92,88 @@ async function requestNeighbours(coords) {
         neighbours = data["neighbours"];
         console.log("Requested neighbours")
         showNeighbours();
+        loadNearbyMarkers(coords);
     }
     catch(error){
         console.log(error)
     }
 }
 
-function resetGame() {
+async function requestQuest(completed) {
+
+    // This function gets the current landmark quest, its target and precomputed route from the server
+    // Passing the index of the current quest marks it as completed, and the next quest is returned
+
+    const send_quest = {"type": "quest", "session": sessionId, "completed": completed}
+    try{
+        const response = await fetch('/main',{
+            method: "POST",
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(send_quest)
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const data = await response.json();
+        questIndex = data["index"];
+        return data;
+    }
+    catch(error){
+        console.log(error)
+    }
+}
+
+async function requestReset() {
+
+    // This function moves the player back to the start of the round on the server
+    // The server only accepts moves to the neighbours it sent last, so the start cannot simply be requested again
+
+    const send_reset = {"type": "reset", "session": sessionId}
+    try{
+        const response = await fetch('/main',{
+            method: "POST",
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(send_reset)
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const data = await response.json();
+        neighbours = data["neighbours"];
+    }
+    catch(error){
+        console.log(error)
+    }
+}
+
+async function startQuests() {
+    // This function empties the quest log and adds the first quest of the chain, which leads to the first landmark
+
+    quests = [];
+    questsSet = new Set();
+    const quest = await requestQuest(null);
+    if (quest) {
+        addQuest(quest["quest"]);
+        if (!quest["finished"]) end = quest["coords"];
+    }
+    updateQuestLog();
+}
+
+async function resetGame() {
     // This function resets the game
 
     console.log("Resetting")
 
+    await requestReset();
+    await startQuests();
     clearMap();
     startNewRound();
 }
@@ -128,12 +207,11 @@ async function initializeGame(){
     try{
         // score = 0;
         // scoreText.innerHTML = score;
-        addQuest("Go to the windmill");
-        updateQuestLog();
         const data = await initializeFlask();
         console.log(data);
         console.log("Data received");
         await loadData(data);
+        await startQuests();
         startNewRound();
     }
     catch(error){
@@ -146,25 +224,23 @@ async function loadData(data){
     // All the data gets loaded from a json dictionary (represented as an object in JS)
 
     neighbours = data["neighbours"];
-    // end = data["end"]; Normally this.
+    sessionId = data["session"];
+    mapId = data["map"];
+    // The end is replaced by the target of the first landmark quest when the server sends it
+    end = data["end"];
     // end = [52.15896289011223, 4.492492679291971] // Sastle coords
-    end = [52.164610049352, 4.48653665761824] // Windmill coords
-    // start = data["start"];
-    start = [52.16583, 4.483413] // Leiden Centraal start
+    // end = [52.164610049352, 4.48653665761824] // Windmill coords
+    // The server tracks the path from the round start, so the start can no longer be chosen by the client
+    start = data["start"];
+    // start = [52.16583, 4.483413] // Leiden Centraal start
     // start = [52.15835, 4.493067] // Castle start
 
+    // The markers are requested from the server around the player as the game goes on
     markerData = [];
+    loadedMarkerIds = new Set();
+    totalMarkers = 0;
     placedMarkersCoords = new Set();
     numPlacedMarkers = 0;
-
-    markerData = markerData.concat(await loadPoemData("static/csv_files/poems_geocoded.csv"));
-    markerData = markerData.concat(await loadCsvData("static/csv_files/restaurants.csv", "food_marker_icon", "box"));
-    markerData = markerData.concat(await loadCsvData("static/csv_files/main_landmarks.csv", "end_marker_icon", "full"));
-    console.log(markerData);
-
-    console.log(markerData.length + " markers added");
-
-    
 }
 
 
@@ -180,8 +256,12 @@ function addQuest(quest) {
 
 function completeQuest(quest, newQuestLatitude, newQuestLongitude) {
     if (quests.includes(quest)) {
-        changeEnd([newQuestLatitude, newQuestLongitude]);
-        console.log("New end: " + end);
+        // The next landmark is known by the server, which also precomputed the route to it
+        requestQuest(questIndex).then(next => {
+            if (next && !next["finished"]) changeEnd(next["coords"]);
+            else if (newQuestLatitude !== undefined) changeEnd([newQuestLatitude, newQuestLongitude]);
+            console.log("New end: " + end);
+        });
         quests = quests.filter(e => e !== quest); // Remove the quest from the quests array
     }
 }
@@ -224,80 +304,58 @@ function showBar(percentage) {
 
 
 
-async function loadPoemData(filepath) {
-    // Load CSV using D3
-    const rows = await d3.dsv(";", filepath);
-
-    const results = [];
-
-    for (const row of rows) {
-        const lat = parseFloat(row.latitude);
-        const lng = parseFloat(row.longitude);
-
-        // Build the expected image path
-        const imgPath = `static/poem_images/${row.id}.jpg`;
-
-        // Build a safe object
-        results.push({
-            coords: [
-                isFinite(lat) ? lat : 0,
-                isFinite(lng) ? lng : 0
-            ],
-            title: row.original_title +
-                (row.dutch_title && row.dutch_title !== "EMPTY"
-                    ? ` ${row.dutch_title}`
-                    : ""),
-            author: row.author || "",
-            placement_year: row.placement_year || "",
-            language: row.language || "",
-            image: imgPath,
-            icon: "poem_marker_icon",
-            style: "box"
-        });
+async function loadNearbyMarkers(position) {
+    // This function requests the markers inside the area the player can reach with the next move
+    // The area is the bounding box of the current position and the offered roads, padded by the visibility radius
+
+    let south = position[0], north = position[0], west = position[1], east = position[1];
+    for (const duo of neighbours) {
+        for (const point of duo[1]) {
+            south = Math.min(south, point[0]);
+            north = Math.max(north, point[0]);
+            west = Math.min(west, point[1]);
+            east = Math.max(east, point[1]);
+        }
     }
+    const padLatitude = VISIBILITY_RADIUS / 111320;
+    const padLongitude = padLatitude / Math.cos(position[0] * Math.PI / 180);
+    const query = new URLSearchParams({south: south - padLatitude, west: west - padLongitude,
+                                       north: north + padLatitude, east: east + padLongitude, map: mapId});
 
-    return results;
-}
+    try {
+        const response = await fetch(`/poi?${query}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
 
-async function loadCsvData(filepath, icon, style) {
-    // Load CSV using D3
-    const rows = await d3.dsv(";", filepath);
-
-    const results = [];
-
-    for (const row of rows) {
-        
-        const latitude = parseFloat(row.latitude);
-        const longitude = parseFloat(row.longitude);
-
-        // Build the expected image path
-        const imgPath = `static/images/${row.image}`;
-        const imgPath2 = `static/images/${row.image2}` || '';
-        const imgPath3 = `static/images/${row.image3}` || '';
-
-        // Build base object with required fields
-        const markerObj = {
-            coords: [
-                isFinite(latitude) ? latitude : null,
-                isFinite(longitude) ? longitude : null
-            ],
-            image: imgPath,
-            image2: imgPath2,
-            image3: imgPath3,
-            icon: icon,
-            style: style
-        };
-
-        // Dynamically add all other columns from the CSV
-        for (const [key, value] of Object.entries(row)) {
-            // Skip the columns we've already processed
-            if (!['latitude', 'longitude', 'image', 'image2', 'image3'].includes(key)) {
-                markerObj[key] = value;
+        const data = await response.json();
+        totalMarkers = data["total"];
+        for (const marker of data["markers"]) {
+            if (!loadedMarkerIds.has(marker.id)) {
+                loadedMarkerIds.add(marker.id);
+                markerData.push(marker);
             }
         }
+    }
+    catch(error){
+        console.log(error)
+    }
+}
+
+async function loadMarkerDetails(markerDatum) {
+    // The long texts of a marker are only requested the first time it is opened
+
+    if (!markerDatum.detailsLoaded) {
+        const response = await fetch(`/poi/${markerDatum.id}?${new URLSearchParams({map: mapId})}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
 
-        results.push(markerObj);
+        Object.assign(markerDatum, await response.json());
+        // The server picks the smallest resized poem image that fits this width
+        if (markerDatum.kind === "poem") markerDatum.image += `?w=${POEM_IMAGE_WIDTH}`;
+        markerDatum.detailsLoaded = true;
     }
 
-    return results;
-}
\ No newline at end of file
+    return markerDatum;
+}